@@ -2,23 +2,29 @@
 from matplotlib.pylab import *
 from mpl_toolkits.axes_grid1 import host_subplot
 import matplotlib.animation as animation
-import time
+from telemetry import EncoderSampler
+
+# Live plot of the distance and speed of both wheels. The encoders are
+# sampled by an EncoderSampler (telemetry.py) into a fixed-capacity ring
+# buffer; the plot only reads it. When the sampler runs its own thread the
+# plot is a low-rate consumer and the data keeps its rate and timestamps
+# when drawing falls behind; otherwise every frame takes one sample.
+# The lines show the last xmax seconds, with the newest sample at t = 0,
+# so the axes stay still and every frame costs the same however long the
+# robot runs. The lines are returned for blitting by FuncAnimation(blit=True).
 
 class multiplePlots:
     def __init__(self, leftEncoderCount, rightEncoderCount,
-                 samples, xmax):
+                 samples, xmax, sampler=None):
         self.leftEncoderCount = leftEncoderCount
         self.rightEncoderCount = rightEncoderCount
         self.samples = samples
+        if sampler is None:
+            sampler = EncoderSampler(leftEncoderCount, rightEncoderCount, samples=samples)
+        self.sampler = sampler
         self.xmax = xmax
         self.ymax = 200
 		
-	  #Define sampleTime to calculate the speed and the tf variable, which
-        #represents 
-	  #the end time of the speed measuring
-        self.sampleTime = 1
-        self.tf = time.time() + self.sampleTime
-
         # Sent for figure
         self.font = {'size'   : 9}
         matplotlib.rc('font', **self.font)
@@ -29,19 +35,12 @@ class multiplePlots:
         self.ax01 = subplot2grid((1, 2), (0, 0))
         self.ax02 = subplot2grid((1, 2), (0, 1))
 
-        # Data Placeholders
-        self.yp1=zeros(0)
-        self.yv1=zeros(0)
-        self.yp2=zeros(0)
-        self.yv2=zeros(0)
-        self.t=zeros(0)
-
         # set plots
-        self.p011, = self.ax01.plot(self.t,self.yp1,'b-', label="LeftWheel")
-        self.p012, = self.ax01.plot(self.t,self.yp2,'g-', label="RightWheel")
+        self.p011, = self.ax01.plot([],[],'b-', label="LeftWheel")
+        self.p012, = self.ax01.plot([],[],'g-', label="RightWheel")
 
-        self.p021, = self.ax02.plot(self.t,self.yv1,'b-', label="LeftWheel")
-        self.p022, = self.ax02.plot(self.t,self.yv2,'g-', label="RightWheel")
+        self.p021, = self.ax02.plot([],[],'b-', label="LeftWheel")
+        self.p022, = self.ax02.plot([],[],'g-', label="RightWheel")
 
         # set legends
         self.ax01.legend([self.p011,self.p012],
@@ -61,18 +60,18 @@ class multiplePlots:
         self.ax01.set_ylim(0,200)
         self.ax02.set_ylim(0,50)
 
-        # set x-limits
-        self.ax01.set_xlim(0,5.0)
-        self.ax02.set_xlim(0,5.0)
+        # set x-limits, time relative to the newest sample
+        self.ax01.set_xlim(-self.xmax,0)
+        self.ax02.set_xlim(-self.xmax,0)
 
         # Turn on grids
         self.ax01.grid(True)
         self.ax02.grid(True)
 
         # set label names
-        self.ax01.set_xlabel("t")
+        self.ax01.set_xlabel("t (s)")
         self.ax01.set_ylabel("Distance")
-        self.ax02.set_xlabel("t")
+        self.ax02.set_xlabel("t (s)")
         self.ax02.set_ylabel("Ticks")
 
 	  #start the variables with 0
@@ -81,57 +80,49 @@ class multiplePlots:
         
         self.leftSpeed = 0
         self.rightSpeed = 0
-        
-        self.ini_pos_left = 0
-        self.ini_pos_right = 0
 		
-		# measure the speed of the robot
+		# speed of the robot over the last `samples` encoder ticks, from the newest sample
     def getSpeed(self):
-        if (time.time() >= self.tf):
-            self.tf = time.time() + self.sampleTime
-            self.leftSpeed = (self.leftEncoderCount.getTotalDistance() - self.ini_pos_left)/self.sampleTime
-            self.rightSpeed = (self.rightEncoderCount.getTotalDistance() - self.ini_pos_right)/self.sampleTime
-            self.ini_pos_left = self.leftEncoderCount.getTotalDistance()
-            self.ini_pos_right = self.rightEncoderCount.getTotalDistance()
+        latest = self.sampler.telemetry.latest()
+        if latest is None:
+            return
+        self.leftSpeed = latest[EncoderSampler.LEFT_SPEED]
+        self.rightSpeed = latest[EncoderSampler.RIGHT_SPEED]
 
     def teste(self):
-        return self.xmax, self.yp1
+        return self.xmax, self.sampler.telemetry.window(self.xmax)[:, EncoderSampler.LEFT_DIST]
 
     def updateData(self):
-        self.totLeftDist = self.leftEncoderCount.getTotalDistance()
-        self.totRightDist = self.rightEncoderCount.getTotalDistance()
-        
-        self.getSpeed()
-        
-        self.yp1=append(self.yp1,self.totLeftDist)
-        self.yv1=append(self.yv1,self.leftSpeed)
-        self.yp2=append(self.yp2,self.totRightDist)
-        self.yv2=append(self.yv2,self.rightSpeed)
-        self.t=append(self.t,self.x)
-        
-        print(f"Left Ticks: {self.leftEncoderCount.getTicks()}, Right Ticks: {self.rightEncoderCount.getTicks()}")
-        print(f"Left Speed: {self.leftSpeed}, Right Speed: {self.rightSpeed}")
-        print(f"Left Distance: {self.leftEncoderCount.getTotalDistance()}, Right Distance: {self.rightEncoderCount.getTotalDistance()}")
-
-        self.x += 0.3
-
-        self.p011.set_data(self.t,self.yp1)
-        self.p012.set_data(self.t,self.yp2)
-
-        self.p021.set_data(self.t,self.yv1)
-        self.p022.set_data(self.t,self.yv2)
-		
-		#actualizing data
-        if self.yp1[-1] >= self.ymax-40.00:
-            self.p011.axes.set_ylim(self.yp1[-1]-self.ymax+40.0,self.yp1[-1]+40.0)
-        if self.yp2[-1] >= self.ymax-40.00:
-            self.p011.axes.set_ylim(self.yp2[-1]-self.ymax+40.0,self.yp2[-1]+40.0)
-        if self.yv1[-1] >= self.ymax-40.00:
-            self.p021.axes.set_ylim(self.yv1[-1]-self.ymax+40.0,self.yv1[-1]+40.0)
-        if self.yv2[-1] >= self.ymax-40.00:
-            self.p021.axes.set_ylim(self.yv2[-1]-self.ymax+40.0,self.yv2[-1]+40.0)
+        if not self.sampler.running:
+            self.sampler.sample()
+
+        # Copy of the window, a running sampler keeps writing to the buffer
+        window = self.sampler.telemetry.window(self.xmax).copy()
+        if len(window) == 0:
+            # The sampler thread has not taken its first sample yet
+            return self.p011, self.p012, self.p021, self.p022
+        latest = window[-1]
+        self.totLeftDist = latest[EncoderSampler.LEFT_DIST]
+        self.totRightDist = latest[EncoderSampler.RIGHT_DIST]
+        self.leftSpeed = latest[EncoderSampler.LEFT_SPEED]
+        self.rightSpeed = latest[EncoderSampler.RIGHT_SPEED]
+
+        t = window[:, 0] - latest[0]
+        self.p011.set_data(t,window[:, EncoderSampler.LEFT_DIST])
+        self.p012.set_data(t,window[:, EncoderSampler.RIGHT_DIST])
+
+        self.p021.set_data(t,window[:, EncoderSampler.LEFT_SPEED])
+        self.p022.set_data(t,window[:, EncoderSampler.RIGHT_SPEED])
 		
-        if self.x >= self.xmax-1.00:
-            self.p011.axes.set_xlim(self.x-self.xmax+1.0,self.x+1.0)
-            self.p021.axes.set_xlim(self.x-self.xmax+1.0,self.x+1.0)
-
+		#actualizing data, a change of limits redraws the whole figure so
+		#the limits jump by half a screen instead of following every frame
+        top = max(self.totLeftDist, self.totRightDist)
+        if top >= self.p011.axes.get_ylim()[1]-40.00:
+            self.p011.axes.set_ylim(top-self.ymax/2,top+self.ymax/2)
+            self.f0.canvas.draw_idle()
+        top = max(self.leftSpeed, self.rightSpeed)
+        if top >= self.p021.axes.get_ylim()[1]-10.00:
+            self.p021.axes.set_ylim(0,top*1.5+10.0)
+            self.f0.canvas.draw_idle()
+
+        return self.p011, self.p012, self.p021, self.p022
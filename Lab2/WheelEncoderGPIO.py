@@ -1,4 +1,5 @@
-import RPi.GPIO as gpio
+from array import array
+from robot_backend import gpio, clock
 
 class WheelEncoder:
 
@@ -10,11 +11,16 @@ class WheelEncoder:
   distPerTick = 0.0
   PI = 3.1415
 
-  def __init__(self, inputPin, ticksPerTurn, radius):
+  def __init__(self, inputPin, ticksPerTurn, radius, historySize=256):
     self.inputPin = inputPin
     self.ticksPerTurn = ticksPerTurn
     self.radius = radius
 
+    # Preallocated ring buffer with the monotonic timestamp of every edge,
+    # slot accTicks % historySize holds the most recent one
+    self.historySize = historySize
+    self.tickTimes = array('d', bytes(8 * historySize))
+
     self.setDistPerTick(self.ticksPerTurn, self.radius)
 
     gpio.setmode(gpio.BOARD)
@@ -52,8 +58,43 @@ class WheelEncoder:
       return self.accTicks
 
   def my_callback(self, channel):
+    self.tickTimes[(self.accTicks + 1) % self.historySize] = clock.monotonic()
     self.ticks += 1
     self.accTicks += 1
 
+  # Timestamp of the n-th most recent edge (0 is the last one), None if unknown
+  def getTickTime(self, n=0):
+    total = self.accTicks
+    if n >= total or n >= self.historySize:
+      return None
+    return self.tickTimes[(total - n) % self.historySize]
+
+  # Time between the last two edges in seconds
+  def getTickPeriod(self):
+    return self.getWindowPeriod(1)
+
+  # Average time per edge over the last n edges, O(1) through the ring buffer
+  def getWindowPeriod(self, n):
+    n = min(n, self.historySize - 1)
+    last = self.getTickTime(0)
+    first = self.getTickTime(n)
+    if last is None or first is None or last <= first:
+      return None
+    return (last - first) / n
+
+  # Speed in cm/s from the last tick period. If no edge arrived for longer
+  # than one period the elapsed time is used instead, so the value decays to
+  # zero when the wheel stops.
+  def getInstantSpeed(self):
+    return self.getWindowSpeed(1)
+
+  # Speed in cm/s averaged over the last n edges
+  def getWindowSpeed(self, n):
+    period = self.getWindowPeriod(n)
+    if period is None:
+      return 0.0
+    period = max(period, clock.monotonic() - self.getTickTime(0))
+    return self.distPerTick / period
+
   def getTicksPerDistance(self, dist):
     return (dist / self.distPerTick)
@@ -0,0 +1,105 @@
+#Import Libraries
+import math
+from robot_backend import clock
+
+# Fixed-rate control loop scheduled on absolute deadlines of the monotonic
+# clock. Each iteration starts at start + i * period, so sleeping and the
+# time spent in the step do not accumulate as drift. Timing of every
+# iteration is recorded in a LoopStats object.
+
+class LoopStats:
+    def __init__(self, period):
+        self.period = period
+        self.iterations = 0
+        self.overruns = 0
+        self.missed = 0
+        self.sumJitter = 0.0
+        self.sumSqJitter = 0.0
+        self.maxJitter = 0.0
+        self.sumBusy = 0.0
+        self.maxBusy = 0.0
+
+    # jitter: how late the iteration started, busy: time spent in the step
+    def record(self, jitter, busy):
+        self.iterations += 1
+        self.sumJitter += jitter
+        self.sumSqJitter += jitter * jitter
+        self.maxJitter = max(self.maxJitter, jitter)
+        self.sumBusy += busy
+        self.maxBusy = max(self.maxBusy, busy)
+        if busy > self.period:
+            self.overruns += 1
+
+    def meanJitter(self):
+        return self.sumJitter / self.iterations if self.iterations else 0.0
+
+    def stdJitter(self):
+        if not self.iterations:
+            return 0.0
+        mean = self.meanJitter()
+        return math.sqrt(max(self.sumSqJitter / self.iterations - mean * mean, 0.0))
+
+    def summary(self):
+        return {
+            "rate": 1.0 / self.period,
+            "iterations": self.iterations,
+            "overruns": self.overruns,
+            "missed": self.missed,
+            "meanJitter": self.meanJitter(),
+            "stdJitter": self.stdJitter(),
+            "maxJitter": self.maxJitter,
+            "meanBusy": self.sumBusy / self.iterations if self.iterations else 0.0,
+            "maxBusy": self.maxBusy,
+        }
+
+    def __str__(self):
+        s = self.summary()
+        return ("{rate:.0f} Hz: {iterations} iterations, {overruns} overruns, {missed} missed, "
+                "jitter mean {0:.3f} ms max {1:.3f} ms, busy mean {2:.3f} ms max {3:.3f} ms").format(
+            s["meanJitter"] * 1000, s["maxJitter"] * 1000,
+            s["meanBusy"] * 1000, s["maxBusy"] * 1000, **s)
+
+
+class ControlLoop:
+    def __init__(self, rate):
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.stats = LoopStats(self.period)
+
+    # Calls step(dt, i) every period until duration seconds have passed or
+    # step returns False. dt is the measured time since the previous
+    # iteration. If an iteration overruns past the next deadline, the missed
+    # deadlines are skipped instead of running a burst of late iterations.
+    def run(self, step, duration=None):
+        self.stats = LoopStats(self.period)
+        start = clock.monotonic()
+        end = start + duration if duration is not None else None
+        deadline = start
+        previous = start
+        i = 0
+        while True:
+            now = clock.monotonic()
+            if end is not None and now >= end:
+                break
+            jitter = now - deadline
+            dt = now - previous if i > 0 else self.period
+            previous = now
+
+            result = step(dt, i)
+            self.stats.record(jitter, clock.monotonic() - now)
+            if result is False:
+                break
+            i += 1
+
+            deadline += self.period
+            now = clock.monotonic()
+            if now > deadline:
+                # Every deadline up to now is missed, run at the next one
+                skipped = int((now - deadline) / self.period) + 1
+                self.stats.missed += skipped
+                deadline += skipped * self.period
+            if end is not None and deadline > end:
+                clock.sleep(max(end - now, 0.0))
+                break
+            clock.sleep(max(deadline - now, 0.0))
+        return self.stats
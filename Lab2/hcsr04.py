@@ -1,5 +1,10 @@
-import RPi.GPIO as gpio
-import time
+import threading
+from robot_backend import gpio, pigpio, clock, SIMULATED
+
+# BCM gpio of each BOARD pin of the 40-pin header, pigpio numbers by BCM
+BOARD_TO_BCM = {3: 2, 5: 3, 7: 4, 8: 14, 10: 15, 11: 17, 12: 18, 13: 27, 15: 22, 16: 23,
+                18: 24, 19: 10, 21: 9, 22: 25, 23: 11, 24: 8, 26: 7, 27: 0, 28: 1, 29: 5,
+                31: 6, 32: 12, 33: 13, 35: 19, 36: 16, 37: 26, 38: 20, 40: 21}
 
 class HCSR04:
     # Encapsulates the attributes and methods to use the HC-SR04 ultra-sound distance sensor
@@ -13,48 +18,176 @@ class HCSR04:
         self.trig = trig
         self.echo = echo
 
+        # State of the asynchronous (edge-driven) measurement mode
+        self.thread = None
+        self.running = False
+        self.echoDone = threading.Event()
+        self.pulseStart = None
+        self.pulseDuration = None
+        self.distance = None
+        self.rawDistance = None
+        self.filter = None
+        self.timestamp = None
+        self.timeouts = 0
+        self.listeners = []
+        self.pi = None
+        self.echoWatch = None
+
         gpio.setmode(gpio.BOARD)
         gpio.setup(self.trig, gpio.OUT)
         gpio.setup(self.echo, gpio.IN)
         gpio.output(self.trig, False)
         
         # Sleep for 0.3 s for the sensor to settle
-        time.sleep(0.3)
+        clock.sleep(0.3)
     
     def __del__(self):
         gpio.cleanup()
         print("all clean")
     
-    # Measures the distance and returns the distance in the desired unit
-    def measure(self, samples, unit):
+    # Measures the distance and returns the distance in the desired unit,
+    # averaged over samples pulses. A pulse whose echo does not start or end
+    # within timeout seconds is counted in self.timeouts and skipped; None
+    # is returned when every pulse was lost.
+    def measure(self, samples, unit, timeout=0.03):
         count = 0
         acc = 0.0
 
-        while count < samples:
+        for _ in range(samples):
             gpio.output(self.trig, True)
-            time.sleep(0.00001)
+            clock.sleep(0.00001)
             gpio.output(self.trig, False)
 
-            pulse_start = time.time()
-            while gpio.input(self.echo) == 0:
-                pulse_start = time.time()
+            pulse_start = clock.time()
+            deadline = pulse_start + timeout
+            while gpio.input(self.echo) == 0 and pulse_start < deadline:
+                pulse_start = clock.time()
 
-            pulse_end = time.time()
-            while gpio.input(self.echo) == 1:
-                pulse_end = time.time()
+            pulse_end = clock.time()
+            while gpio.input(self.echo) == 1 and pulse_end < deadline + timeout:
+                pulse_end = clock.time()
 
-            pulse_duration = pulse_end - pulse_start
+            if pulse_start >= deadline or pulse_end >= deadline + timeout:
+                self.timeouts += 1
+                continue
 
-            if unit == "cm":
-                distance = pulse_duration * self.const_cm
-            elif unit == "in":
-                distance = pulse_duration * self.const_in
-            elif unit == "ft":
-                distance = pulse_duration * self.const_ft
-            else:
-                raise ValueError("Invalid unit. Choose 'cm', 'in', or 'ft'.")
+            pulse_duration = pulse_end - pulse_start
+            distance = self.convert(pulse_duration, unit)
             
             acc += distance
             count += 1
         
-        return round(acc / samples, 2)
+        if count == 0:
+            return None
+        return round(acc / count, 2)
+
+    # Converts an echo pulse duration in seconds to a distance in the given unit
+    def convert(self, pulse_duration, unit):
+        if unit == "cm":
+            return pulse_duration * self.const_cm
+        elif unit == "in":
+            return pulse_duration * self.const_in
+        elif unit == "ft":
+            return pulse_duration * self.const_ft
+        raise ValueError("Invalid unit. Choose 'cm', 'in', or 'ft'.")
+
+    # Starts the asynchronous measurement mode: a background thread triggers
+    # the sensor rate times per second and the echo edges are timed by a
+    # pigpio callback, so nothing busy-waits. pigpio reports the level and
+    # the hardware tick of every edge, so even short echoes are timed
+    # exactly. Readings lost for longer than timeout seconds are counted in
+    # self.timeouts and skipped. An optional filter (see sonar_filter.py) is
+    # updated with every raw reading; its thresholds must be in the same
+    # unit. On the simulator there is no thread (see robot_backend.SimClock):
+    # getDistance() triggers the sensor from the caller's loop instead.
+    def start(self, rate=20, unit="cm", timeout=0.03, filter=None):
+        self.convert(0, unit)
+        filterUnit = getattr(filter, "unit", None)
+        if filterUnit is not None and filterUnit != unit:
+            raise ValueError("Filter thresholds are in {}, not {}".format(filterUnit, unit))
+        if self.running:
+            return self
+        self.rate = rate
+        self.unit = unit
+        self.timeout = timeout
+        self.filter = filter
+        self.nextTrigger = clock.monotonic()
+        self.running = True
+        self.pi = pigpio.pi()
+        self.echoWatch = self.pi.callback(BOARD_TO_BCM[self.echo], pigpio.EITHER_EDGE, self.echoCallback)
+        if not SIMULATED:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            if self.thread is not threading.current_thread():
+                self.thread.join()
+            self.thread = None
+        if self.echoWatch is not None:
+            self.echoWatch.cancel()
+            self.echoWatch = None
+            self.pi.stop()
+            self.pi = None
+
+    # Registers func(distance, timestamp), called for every new reading
+    def addListener(self, func):
+        self.listeners.append(func)
+
+    # Latest distance from the asynchronous mode, None before the first echo
+    def getDistance(self):
+        if self.running and self.thread is None and clock.monotonic() >= self.nextTrigger:
+            # No trigger thread, measure from the caller at most rate times per second
+            self.nextTrigger = clock.monotonic() + 1.0 / self.rate
+            self.trigger()
+        return self.distance
+
+    # Called by pigpio on both edges of the echo, tick in microseconds
+    def echoCallback(self, gpioPin, level, tick):
+        if level == 1:
+            self.pulseStart = tick
+        elif level == 0 and self.pulseStart is not None:
+            self.pulseDuration = pigpio.tickDiff(self.pulseStart, tick) / 1e6
+            self.pulseStart = None
+            self.echoDone.set()
+
+    def publish(self, distance):
+        self.rawDistance = distance
+        if self.filter is not None:
+            distance = self.filter.update(distance)
+            if distance is None:
+                return
+        self.distance = round(distance, 2)
+        self.timestamp = clock.monotonic()
+        for func in self.listeners:
+            func(self.distance, self.timestamp)
+
+    # One measurement: triggers the sensor and waits for its echo
+    def trigger(self):
+        self.echoDone.clear()
+        self.pulseStart = None
+
+        gpio.output(self.trig, True)
+        clock.sleep(0.00001)
+        gpio.output(self.trig, False)
+
+        if clock.wait(self.echoDone, self.timeout):
+            self.publish(self.convert(self.pulseDuration, self.unit))
+        else:
+            self.timeouts += 1
+
+    def run(self):
+        period = 1.0 / self.rate
+        nextTrigger = clock.monotonic()
+        while self.running:
+            self.trigger()
+
+            # Absolute scheduling keeps the trigger rate steady
+            nextTrigger += period
+            delay = nextTrigger - clock.monotonic()
+            if delay > 0:
+                clock.sleep(delay)
+            else:
+                nextTrigger = clock.monotonic()
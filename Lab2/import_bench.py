@@ -0,0 +1,50 @@
+#Import Libraries
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Startup time of the robot entry points. Every statement runs in a fresh
+# interpreter, so module caches do not hide the import cost. The last entry
+# forces the plot and encoder setup to show what a lazy import saves.
+#
+# python3 import_bench.py [--runs 10] [--hardware]
+
+STATEMENTS = [
+    ("python", "pass"),
+    ("robot", "import robot"),
+    ("rotationSpeed_Graph", "import rotationSpeed_Graph"),
+    ("pid_controller", "import pid_controller"),
+    ("lab2_paths", "import lab2_paths"),
+    ("pid_controller + plot", "import pid_controller; pid_controller.robot.plot()"),
+]
+
+def run(statement, runs, env):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True, env=env,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--hardware', action='store_true')  # Use the real backends instead of the simulator
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("MPLBACKEND", "Agg")
+    if not args.hardware:
+        env["STINGRAY_SIM"] = "1"
+
+    for name, statement in STATEMENTS:
+        times = run(statement, args.runs, env)
+        print("{:<24} min {:7.1f} ms  median {:7.1f} ms".format(
+            name, min(times) * 1e3, statistics.median(times) * 1e3))
+
+if __name__ == "__main__":
+    main()
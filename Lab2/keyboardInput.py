@@ -1,4 +1,3 @@
-import pigpio
 import termios
 import tty
 import sys
@@ -15,8 +14,6 @@ def getch():
         termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
     return ch
 
-raspi = pigpio.pi()
-
 while True:
     char = getch()
     
@@ -39,7 +36,7 @@ while True:
     elif char == "f":
         print("Stopping program.")
         rotationSpeed_Graph.motorStop()  # Stop motors before exiting
-        raspi.stop()
+        rotationSpeed_Graph.robot.close()
         exit()
 
     # Stop motors when no key is pressed
@@ -1,67 +1,95 @@
+import argparse
+import math
 import rotationSpeed_Graph
-import time
-import pigpio
+from robot_backend import clock
 import pid_controller
 from hcsr04 import HCSR04
+from sonar_filter import defaultFilter
+from telemetry_log import SONAR
 
-samples = 5
-sensor = HCSR04(7, 12)
+rate = 20
 
-
-raspi = pigpio.pi()
+# Moves by distance (cm) and angle (degrees, counter-clockwise when
+# positive), see pid_controller.drive/turn. The values replace the old timed
+# moves at the ramp speed of the wheel PID (about 14 cm/s) and 90 degrees
+# per 0.25 s of turning. The old left() spun the wheels clockwise and
+# right() counter-clockwise, the turns keep those pulsewidths.
 def path1():
-   time.sleep(1)
-   pid_controller.straight(1.1)
-   time.sleep(1)
-   pid_controller.right(0.25)
-   pid_controller.straight(1)
-   time.sleep(1)
-   pid_controller.left(0.25)
-   pid_controller.straight(1)
-   time.sleep(1)
-   pid_controller.straight(2)
-   time.sleep(1)
-   pid_controller.left(0.25)
-   pid_controller.straight(1)
-   time.sleep(1)
-   pid_controller.right(0.25)
-   pid_controller.straight(1)
-   time.sleep(1)
-   pid_controller.straight(1.5)
+   clock.sleep(1)
+   pid_controller.drive(15)
+   clock.sleep(1)
+   pid_controller.turn(90)
+   pid_controller.drive(14)
+   clock.sleep(1)
+   pid_controller.turn(-90)
+   pid_controller.drive(14)
+   clock.sleep(1)
+   pid_controller.drive(28)
+   clock.sleep(1)
+   pid_controller.turn(-90)
+   pid_controller.drive(14)
+   clock.sleep(1)
+   pid_controller.turn(90)
+   pid_controller.drive(14)
+   clock.sleep(1)
+   pid_controller.drive(21)
 
 def path2():
-    time.sleep(1)
-    pid_controller.straight(1)
-    time.sleep(1)
-    pid_controller.left(1)
-    pid_controller.straight(1)
-    time.sleep(1)
-    pid_controller.right(0.12)
-    pid_controller.straight(2.5)
-    time.sleep(1)
-    pid_controller.left(0.5)
-    pid_controller.straight(1)
-    time.sleep(1)
-    pid_controller.right(0.5)
-    pid_controller.straight(2)
-    time.sleep(1)
+    clock.sleep(1)
+    pid_controller.drive(14)
+    clock.sleep(1)
+    pid_controller.turn(-360)
+    pid_controller.drive(14)
+    clock.sleep(1)
+    pid_controller.turn(43)
+    pid_controller.drive(35)
+    clock.sleep(1)
+    pid_controller.turn(-180)
+    pid_controller.drive(14)
+    clock.sleep(1)
+    pid_controller.turn(180)
+    pid_controller.drive(28)
+    clock.sleep(1)
     
+# Drives through waypoints (x, y) in cm of the odometry frame, x forward and
+# y to the left of the start. Each leg starts from the pose the odometry
+# measured, so the error of one leg is corrected by the next.
+square = [(30, 0), (30, 30), (0, 30), (0, 0)]
+
+def path3(waypoints=square):
+    clock.sleep(1)
+    rotationSpeed_Graph.robot.odometry().reset()
+    for x, y in waypoints:
+        pose = pid_controller.drive_to(x, y)
+        print("Pose: {:.1f} cm, {:.1f} cm, {:.0f} degrees".format(pose[0], pose[1], math.degrees(pose[2])))
+        clock.sleep(1)
+
 def hcsr():
+    # Readings arrive asynchronously, the loop only checks the latest one
+    sensor = HCSR04(7, 12)
+    robot = rotationSpeed_Graph.robot
+    if robot.recorder is not None:
+        sensor.addListener(lambda distance, stamp: robot.record(SONAR, distance, sensor.rawDistance, t=stamp))
+    sensor.start(rate, "cm", filter=defaultFilter(unit="cm"))
     while True:
-        s = time.time()
-        distance = sensor.measure(samples, "cm")
-        e = time.time()
-        print("Distance:", distance, "cm")
-        print("Used time:", (e - s), "seconds")
-        if distance < 5 :
-            pid_controller.right(0.5)
-            pid_controller.straight(1.5)
-            time.sleep(1)
-        time.sleep(0.01)
-    sensorThread = threading.Thread(target=Sonar, args=(sensor, samples))
-    sensorThread.start()
+        distance = sensor.getDistance()
+        if distance is not None and distance < 5 :
+            print("Distance:", distance, "cm")
+            pid_controller.turn(180)
+            pid_controller.drive(21)
+            clock.sleep(1)
+        clock.sleep(1.0 / rate)
+
 def main():
-    hcsr()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--record', default=None)  # Binary telemetry log (telemetry_log.py)
+    args = parser.parse_args()
+    if args.record:
+        rotationSpeed_Graph.robot.startRecording(args.record)
+    try:
+        hcsr()
+    finally:
+        rotationSpeed_Graph.robot.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,87 @@
+#Import Libraries
+import math
+import threading
+import numpy as np
+
+# Differential-drive odometry from the two wheel encoders. Every update
+# turns the new ticks of each wheel into a travelled distance (signed by
+# the wheel direction, the encoders only count edges) and integrates the
+# pose (x, y, theta) with the midpoint rule:
+#
+#   ds = (dl + dr) / 2        dtheta = (dr - dl) / wheelBase
+#   x += ds cos(theta + dtheta / 2)    y += ds sin(theta + dtheta / 2)
+#
+# x points forward at reset, theta is counter-clockwise in radians and
+# distances are in cm. The covariance of the pose grows with the distance
+# of each wheel (variance kLeft * |dl| and kRight * |dr|, in cm^2 per cm),
+# propagated through the Jacobians of the update.
+#
+# robot.Robot calls update() before every motor command, since the ticks
+# are signed with the direction of the command they were counted under;
+# readers call it to bring the pose up to date. update() and reset() hold
+# a lock, so the control loop and a reader never count the same ticks twice.
+
+class Odometry:
+    def __init__(self, leftEncoder, rightEncoder, wheelBase, directions=None,
+                 kLeft=0.01, kRight=0.01):
+        self.leftEncoder = leftEncoder
+        self.rightEncoder = rightEncoder
+        self.wheelBase = wheelBase
+        # Callable returning the (left, right) wheel directions, 1, -1 or 0
+        self.directions = directions if directions is not None else (lambda: (1, 1))
+        self.kLeft = kLeft
+        self.kRight = kRight
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self, x=0.0, y=0.0, theta=0.0):
+        with self.lock:
+            self.lastLeft = self.leftEncoder.getTotalTicks()
+            self.lastRight = self.rightEncoder.getTotalTicks()
+            self.pose = (x, y, theta)
+            self.covariance = np.zeros((3, 3))
+            self.distance = 0.0
+
+    def getPose(self):
+        return self.pose
+
+    def getCovariance(self):
+        return self.covariance
+
+    # Reads the encoders and integrates the ticks since the last update
+    def update(self):
+        with self.lock:
+            left = self.leftEncoder.getTotalTicks()
+            right = self.rightEncoder.getTotalTicks()
+            leftTicks = left - self.lastLeft
+            rightTicks = right - self.lastRight
+            if leftTicks == 0 and rightTicks == 0:
+                return self.pose
+            self.lastLeft = left
+            self.lastRight = right
+
+            leftDirection, rightDirection = self.directions()
+            dl = leftDirection * leftTicks * self.leftEncoder.distPerTick
+            dr = rightDirection * rightTicks * self.rightEncoder.distPerTick
+            ds = (dl + dr) / 2.0
+            dtheta = (dr - dl) / self.wheelBase
+
+            x, y, theta = self.pose
+            heading = theta + dtheta / 2.0
+            c = math.cos(heading)
+            s = math.sin(heading)
+
+            # Jacobians of the update to the pose and to (dl, dr)
+            Fx = np.array([[1.0, 0.0, -ds * s],
+                           [0.0, 1.0, ds * c],
+                           [0.0, 0.0, 1.0]])
+            b = self.wheelBase
+            Fu = np.array([[c / 2 + ds * s / (2 * b), c / 2 - ds * s / (2 * b)],
+                           [s / 2 - ds * c / (2 * b), s / 2 + ds * c / (2 * b)],
+                           [-1.0 / b, 1.0 / b]])
+            Q = np.diag([self.kLeft * abs(dl), self.kRight * abs(dr)])
+
+            self.covariance = Fx @ self.covariance @ Fx.T + Fu @ Q @ Fu.T
+            self.pose = (x + ds * c, y + ds * s, math.atan2(math.sin(theta + dtheta), math.cos(theta + dtheta)))
+            self.distance += abs(ds)
+            return self.pose
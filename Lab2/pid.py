@@ -0,0 +1,92 @@
+#Import Libraries
+import numpy as np
+
+# PID controller for N channels at once. Gains and limits may be scalars or
+# one value per channel. All state lives in preallocated arrays and update()
+# works in place, so a control tick does not allocate.
+#
+# output = feedForward + kp * e + ki * integral(e) - kd * d(measurement)/dt
+#
+# - the derivative acts on the measurement (no kick when the setpoint jumps)
+#   and is low-pass filtered with factor derivativeAlpha (1 = no filtering)
+# - the integral is clamped to [integralMin, integralMax] and is frozen while
+#   the output is saturated in the direction of the error (anti-windup)
+# - the output is saturated to [outMin, outMax]
+
+class PID:
+    def __init__(self, kp, ki=0.0, kd=0.0, channels=1,
+                 outMin=-np.inf, outMax=np.inf,
+                 integralMin=-np.inf, integralMax=np.inf,
+                 derivativeAlpha=1.0):
+        self.channels = channels
+        self.kp = self.channelArray(kp)
+        self.ki = self.channelArray(ki)
+        self.kd = self.channelArray(kd)
+        self.outMin = self.channelArray(outMin)
+        self.outMax = self.channelArray(outMax)
+        self.integralMin = self.channelArray(integralMin)
+        self.integralMax = self.channelArray(integralMax)
+        self.derivativeAlpha = derivativeAlpha
+
+        self.integral = np.zeros(channels)
+        self.derivative = np.zeros(channels)
+        self.prevMeasurement = np.zeros(channels)
+        self.error = np.zeros(channels)
+        self.output = np.zeros(channels)
+        self.work = np.zeros(channels)
+        self.hold = np.zeros(channels, dtype=bool)
+        self.mask = np.zeros(channels, dtype=bool)
+        self.low = np.zeros(channels, dtype=bool)
+        self.first = True
+
+    def channelArray(self, value):
+        out = np.empty(self.channels)
+        out[:] = value
+        return out
+
+    def reset(self):
+        self.integral[:] = 0.0
+        self.derivative[:] = 0.0
+        self.output[:] = 0.0
+        self.first = True
+
+    # setpoint and measurement are scalars or arrays of size channels.
+    # Returns self.output, which is overwritten on the next call.
+    def update(self, setpoint, measurement, dt, feedForward=0.0):
+        np.subtract(setpoint, measurement, out=self.error)
+
+        # Derivative on measurement, low-pass filtered
+        if self.first or dt <= 0:
+            self.prevMeasurement[:] = measurement
+            self.first = False
+        else:
+            np.subtract(measurement, self.prevMeasurement, out=self.work)
+            self.work /= dt
+            self.work -= self.derivative
+            self.work *= self.derivativeAlpha
+            self.derivative += self.work
+            self.prevMeasurement[:] = measurement
+
+        # Integrate only where the last output was not pushing further into
+        # saturation in the same direction as the error
+        np.greater_equal(self.output, self.outMax, out=self.hold)
+        np.greater(self.error, 0.0, out=self.mask)
+        self.hold &= self.mask
+        np.less_equal(self.output, self.outMin, out=self.low)
+        np.less(self.error, 0.0, out=self.mask)
+        self.low &= self.mask
+        self.hold |= self.low
+        np.multiply(self.error, dt, out=self.work)
+        np.putmask(self.work, self.hold, 0.0)
+        self.integral += self.work
+        np.clip(self.integral, self.integralMin, self.integralMax, out=self.integral)
+
+        np.multiply(self.kp, self.error, out=self.output)
+        np.multiply(self.ki, self.integral, out=self.work)
+        self.output += self.work
+        np.multiply(self.kd, self.derivative, out=self.work)
+        self.output -= self.work
+        self.output += feedForward
+
+        np.clip(self.output, self.outMin, self.outMax, out=self.output)
+        return self.output
@@ -1,81 +1,171 @@
-import time
+import math
+from robot_backend import clock
 import rotationSpeed_Graph  # Import the module
+import servo360test
+from control_loop import ControlLoop
+from pid import PID
+from telemetry_log import PID as PID_CHANNEL
+import numpy as np
 
 KP = 15   # Proportional gain
 KD = 0    # Derivative gain
 KI = 3.75 # Integral gain
-
-sampleTime = 0.4  # Keep this value as 0.4 seconds
-
-# Access the encoders from rotationSpeed_Graph
-leftWheelEncoder = rotationSpeed_Graph.leftEncoderCount
-rightWheelEncoder = rotationSpeed_Graph.rightEncoderCount
-
+KP_HEADING = 5  # Proportional gain on the left/right tick difference
+
+sampleTime = 0.4  # Period the gains were tuned at, in seconds
+loopRate = 100    # Control loop rate in Hz
+targetIteration = 10  # Target ticks per sampleTime of the setpoint ramp
+
+neutralSpeed = 1500  # Servo pulsewidth that stops the wheels
+baseSpeed = 30       # Feed-forward pulsewidth offset from neutral
+maxSpeed = 220       # Largest pulsewidth offset from neutral
+
+# One controller for both wheels and the heading: channels are left ticks,
+# right ticks and the left - right tick difference. The gains were tuned for
+# one update every sampleTime, so they are converted to per-second units.
+wheelPid = PID(
+    kp=[KP, KP, KP_HEADING],
+    ki=[KI / sampleTime, KI / sampleTime, 0.0],
+    kd=[KD * sampleTime, KD * sampleTime, 0.0],
+    channels=3,
+    outMin=[0, 0, -maxSpeed / 4],
+    outMax=[maxSpeed, maxSpeed, maxSpeed / 4],
+    integralMin=-maxSpeed * sampleTime / KI,
+    integralMax=maxSpeed * sampleTime / KI,
+    derivativeAlpha=0.5,
+)
+wheelSetpoint = np.zeros(3)
+wheelMeasurement = np.zeros(3)
+wheelFeedForward = np.array([baseSpeed, baseSpeed, 0.0])
+
+# Timing statistics of the last move (control_loop.LoopStats)
+lastLoopStats = None
+
+# The encoders belong to the robot context and are set up by the first move
+robot = rotationSpeed_Graph.robot
+
+# Timed moves, used by the keyboard teleop where a key press means "move a bit"
 def straight(timer):
-    move_pid(leftWheelEncoder, rightWheelEncoder, timer, direction="forward")
+    move_pid(robot.leftEncoder, robot.rightEncoder, timer, direction="forward")
 
 def backward(timer):
-    move_pid(leftWheelEncoder, rightWheelEncoder, timer, direction="backward")
+    move_pid(robot.leftEncoder, robot.rightEncoder, timer, direction="backward")
 
 def left(timer):
-    move_pid(leftWheelEncoder, rightWheelEncoder, timer, direction="left")
+    move_pid(robot.leftEncoder, robot.rightEncoder, timer, direction="left")
 
 def right(timer):
-    move_pid(leftWheelEncoder, rightWheelEncoder, timer, direction="right")
-
-def move_pid(leftWheelEncoder, rightWheelEncoder, timer, direction):
+    move_pid(robot.leftEncoder, robot.rightEncoder, timer, direction="right")
+
+# Moves by distance and angle. They close the loop on the encoder ticks: each
+# wheel stops as soon as it has done its ticks and the move ends when both
+# have, so the result does not depend on the battery or the loop timing.
+# timeout (seconds) only guards against a stalled wheel.
+turnPulsewidth = 200  # Pulsewidth offset from neutral while turning in place
+
+# Drives distance cm straight, backward when negative
+def drive(distance, timeout=None):
+    targetTicks = (robot.leftEncoder.getTicksPerDistance(abs(distance)),
+                   robot.rightEncoder.getTicksPerDistance(abs(distance)))
+    if timeout is None:
+        # Twice the time of the setpoint ramp, plus the start
+        timeout = 2 * max(targetTicks) * sampleTime / targetIteration + 1.0
+    direction = "forward" if distance >= 0 else "backward"
+    return move_pid(robot.leftEncoder, robot.rightEncoder, timeout, direction, targetTicks)
+
+# Turns in place by degrees, counter-clockwise (to the left) when positive,
+# the same sign as the odometry heading. Each wheel travels the arc of a
+# circle whose diameter is the wheel base.
+def turn(degrees, timeout=5.0):
+    arc = servo360test.arc_circle(abs(degrees), robot.wheelBase)
+    targetTicks = (robot.leftEncoder.getTicksPerDistance(arc),
+                   robot.rightEncoder.getTicksPerDistance(arc))
+    direction = "ccw" if degrees > 0 else "cw"
+    return move_pid(robot.leftEncoder, robot.rightEncoder, timeout, direction, targetTicks)
+
+# Drives to the point (x, y) in cm of the odometry frame (robot.odometry(),
+# x forward and y to the left of the pose at its reset): turns towards the
+# point, then drives straight to it. Returns the pose reached.
+def drive_to(x, y):
+    odometry = robot.odometry()
+    px, py, theta = odometry.update()
+    bearing = math.atan2(y - py, x - px)
+    turn(math.degrees(math.atan2(math.sin(bearing - theta), math.cos(bearing - theta))))
+    px, py, theta = odometry.update()
+    drive(math.hypot(x - px, y - py))
+    return odometry.update()
+
+# Runs the wheel control loop for timer seconds, or until both wheels have
+# done their targetTicks = (left, right) ticks when given
+def move_pid(leftWheelEncoder, rightWheelEncoder, timer, direction, targetTicks=None):
+    global lastLoopStats
     leftWheelEncoder.resetTicks()
     rightWheelEncoder.resetTicks()
     
-    targetIteration = 10
-    baseSpeedLeft = 1530
-    baseSpeedRight = 1470
-    maxSpeedLeft = baseSpeedLeft
-    maxSpeedRight = baseSpeedRight
-
-    leftPError = 0
-    rightPError = 0
-    leftSError = 0
-    rightSError = 0
-    target = 0  # Initialize target ticks
-
-    timeout = time.time() + timer
-    i = 0  # Iteration counter
-
-    while time.time() < timeout:
-        leftError = target - leftWheelEncoder.getTicks()
-        rightError = target - rightWheelEncoder.getTicks()
-
-        # PID control calculations
-        if abs(leftError) > 1 or i == 0:
-            leftSpeed = baseSpeedLeft + (leftError * KP) + ((leftError - leftPError) * KD) + (leftSError * KI)
-            leftSpeed = max(min(maxSpeedLeft, leftSpeed), 1720)
-
-        if abs(rightError) > 1 or i == 0:
-            rightSpeed = baseSpeedRight - (rightError * KP) - ((rightError - rightPError) * KD) - (rightSError * KI)
-            rightSpeed = min(max(maxSpeedRight, rightSpeed), 1280)
-
-        # Set motor speeds based on direction
+    wheelPid.reset()
+    wheelSetpoint[:] = 0.0
+
+    def step(dt, i):
+        left = leftWheelEncoder.getTicks()
+        right = rightWheelEncoder.getTicks()
+        wheelMeasurement[0] = left
+        wheelMeasurement[1] = right
+        wheelMeasurement[2] = left - right
+
+        # PID control calculations, one call for both wheels and the heading
+        out = wheelPid.update(wheelSetpoint, wheelMeasurement, dt, wheelFeedForward)
+        leftOffset = min(max(out[0] + out[2], 0), maxSpeed)
+        rightOffset = min(max(out[1] - out[2], 0), maxSpeed)
+
+        # Motor pulsewidths based on direction. The servos are mounted
+        # mirrored: forward is above neutral on the left, below on the right
         if direction == "forward":
-            rotationSpeed_Graph.Robot_forward(leftSpeed, rightSpeed)
+            leftSpeed, rightSpeed = neutralSpeed + leftOffset, neutralSpeed - rightOffset
         elif direction == "backward":
-            rotationSpeed_Graph.Robot_forward(leftSpeed,rightSpeed)
-            rotationSpeed_Graph.Robot_reverse()
+            leftSpeed, rightSpeed = neutralSpeed - leftOffset, neutralSpeed + rightOffset
         elif direction == "left":
-            rotationSpeed_Graph.Robot_left()
+            leftSpeed = rightSpeed = neutralSpeed + turnPulsewidth  # Same as Robot_left()
         elif direction == "right":
-            rotationSpeed_Graph.Robot_right()
-
-        time.sleep(sampleTime)
-
-        leftPError = leftError
-        rightPError = rightError
-        leftSError += leftError
-        rightSError += rightError
-
-        target += targetIteration  # Update target
-        i += 1  # Increment iteration count
+            leftSpeed = rightSpeed = neutralSpeed - turnPulsewidth  # Same as Robot_right()
+        elif direction == "ccw":
+            # Left wheel backward, right wheel forward
+            leftSpeed = rightSpeed = neutralSpeed - turnPulsewidth
+        else:
+            # Left wheel forward, right wheel backward
+            leftSpeed = rightSpeed = neutralSpeed + turnPulsewidth
+
+        # Stop each wheel once it reached its target
+        if targetTicks is not None:
+            leftDone = left >= targetTicks[0]
+            rightDone = right >= targetTicks[1]
+            if leftDone:
+                leftSpeed = 0
+            if rightDone:
+                rightSpeed = 0
+        rotationSpeed_Graph.Robot_speed(leftSpeed, rightSpeed)
+
+        # Log the loop when the robot is recording (robot.startRecording),
+        # the motor commands are logged by robot.setServo
+        if robot.recorder is not None:
+            robot.record(PID_CHANNEL, wheelSetpoint[0], wheelSetpoint[1], left, right, leftOffset, rightOffset)
+            sampler = robot.sampler()
+            if not sampler.running:
+                # No sampler thread (simulator), sample the encoders here
+                sampler.sample()
+
+        if targetTicks is not None and leftDone and rightDone:
+            return False
+
+        # Update target ticks of both wheels, never past the target
+        wheelSetpoint[:2] += targetIteration * dt / sampleTime
+        if targetTicks is not None:
+            wheelSetpoint[0] = min(wheelSetpoint[0], targetTicks[0])
+            wheelSetpoint[1] = min(wheelSetpoint[1], targetTicks[1])
+
+    loop = ControlLoop(loopRate)
+    lastLoopStats = loop.run(step, timer)
 
     rotationSpeed_Graph.motorStop()
-    time.sleep(0.1)
+    clock.sleep(0.1)
     rotationSpeed_Graph.motorStop()
+    return lastLoopStats
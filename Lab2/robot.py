@@ -0,0 +1,176 @@
+#Import Libraries
+from robot_backend import gpio, pigpio
+
+# Explicit context for the stingray hardware. Nothing is set up when this
+# module is imported: the pigpio connection, the GPIO pin mode and the wheel
+# encoder interrupts are created the first time they are used, and the live
+# plot (matplotlib) only when plot() is called. Scripts that never plot,
+# like keyboardInput.py, never import matplotlib.
+#
+# All modules share one Robot through get_robot():
+#
+#   with get_robot() as robot:
+#       robot.setServos(1700, 1300)
+#
+# Leaving the with block stops the motors and the pigpio connection.
+
+class Robot:
+    servos = [23, 24]
+    leftEncoderPin = 11
+    rightEncoderPin = 13
+    leftTicksPerTurn = 32
+    rightTicksPerTurn = 33
+    wheelRadius = 5.65 / 2
+    wheelBase = 20.5  # Distance between the wheels in cm
+    neutralPw = 1500
+
+    def __init__(self):
+        self._pi = None
+        self._leftEncoder = None
+        self._rightEncoder = None
+        self._sampler = None
+        self._plot = None
+        self.recorder = None
+        self._odometry = None
+        # Last pulsewidth sent to each servo, 0 is off, and the direction
+        # each wheel last moved in (see wheelDirections)
+        self.pulsewidths = [0, 0]
+        self.directions = [0, 0]
+
+    @property
+    def pi(self):
+        if self._pi is None:
+            self._pi = pigpio.pi()
+        return self._pi
+
+    def setupEncoders(self):
+        from WheelEncoderGPIO import WheelEncoder
+        gpio.setmode(gpio.BOARD)
+        gpio.setwarnings(False)
+        self._leftEncoder = WheelEncoder(self.leftEncoderPin, self.leftTicksPerTurn, self.wheelRadius)
+        self._rightEncoder = WheelEncoder(self.rightEncoderPin, self.rightTicksPerTurn, self.wheelRadius)
+
+    @property
+    def leftEncoder(self):
+        if self._leftEncoder is None:
+            self.setupEncoders()
+        return self._leftEncoder
+
+    @property
+    def rightEncoder(self):
+        if self._rightEncoder is None:
+            self.setupEncoders()
+        return self._rightEncoder
+
+    # Telemetry of both encoders (telemetry.EncoderSampler), created on the
+    # first call; sampler().start() samples them on a thread at rate Hz
+    def sampler(self, rate=200, samples=5):
+        if self._sampler is None:
+            from telemetry import EncoderSampler
+            self._sampler = EncoderSampler(self.leftEncoder, self.rightEncoder, rate=rate, samples=samples,
+                                           recorder=self.recorder)
+        return self._sampler
+
+    # Starts a binary telemetry log (telemetry_log.py); the control loop,
+    # the sampler and the sonar record into it through record(), and every
+    # servo command is logged by setServo. The sampler is started so the
+    # log has the encoders; on the simulator, where it has no thread, the
+    # control loop samples it instead.
+    def startRecording(self, path):
+        from telemetry_log import TelemetryRecorder
+        self.recorder = TelemetryRecorder(path)
+        self.sampler().recorder = self.recorder
+        self.sampler().start()
+        return self.recorder
+
+    def record(self, channel, *values, t=None):
+        if self.recorder is not None:
+            self.recorder.record(channel, *values, t=t)
+
+    # Live distance/speed plot of both encoders, created on the first call
+    def plot(self, samples=5, xmax=5):
+        if self._plot is None:
+            from PlotDataRobot import multiplePlots
+            self._plot = multiplePlots(self.leftEncoder, self.rightEncoder, samples, xmax,
+                                       sampler=self.sampler(samples=samples))
+        return self._plot
+
+    # Pose of the robot from both encoders (odometry.Odometry), created on
+    # the first call and brought up to date before every motor command
+    def odometry(self):
+        if self._odometry is None:
+            from odometry import Odometry
+            self._odometry = Odometry(self.leftEncoder, self.rightEncoder, self.wheelBase,
+                                      directions=self.wheelDirections)
+        return self._odometry
+
+    # Integrates the ticks counted under the current motor command. The
+    # odometry signs the ticks with the wheel directions, so this runs
+    # before the command changes.
+    def updateOdometry(self):
+        if self._odometry is not None:
+            self._odometry.update()
+
+    # index 0 is the left servo, 1 the right one
+    def setServo(self, index, pulsewidth):
+        self.updateOdometry()
+        pulsewidth = int(pulsewidth)
+        self.pulsewidths[index] = pulsewidth
+        if pulsewidth != 0 and pulsewidth != self.neutralPw:
+            # The servos are mounted mirrored, forward is above neutral on
+            # the left and below it on the right
+            forward = pulsewidth > self.neutralPw if index == 0 else pulsewidth < self.neutralPw
+            self.directions[index] = 1 if forward else -1
+        self.pi.set_servo_pulsewidth(self.servos[index], pulsewidth)
+        self.recordMotors()
+
+    def recordMotors(self):
+        if self.recorder is not None:
+            from telemetry_log import MOTORS
+            self.record(MOTORS, *self.pulsewidths)
+
+    def setServos(self, left, right):
+        self.setServo(0, left)
+        self.setServo(1, right)
+
+    # Direction each wheel last moved in: 1 forward, -1 backward, 0 before
+    # the first command. The encoders count ticks in both directions alike;
+    # a stopped wheel keeps its direction, so the ticks it counts while
+    # coasting to a stop are signed like the ones before.
+    def wheelDirections(self):
+        return self.directions[0], self.directions[1]
+
+    def stopMotors(self):
+        self.updateOdometry()
+        self.pulsewidths = [0, 0]
+        if self._pi is not None:
+            for servo in self.servos:
+                self._pi.set_servo_pulsewidth(servo, 0)
+        self.recordMotors()
+
+    def close(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+        self.stopMotors()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self._pi is not None:
+            self._pi.stop()
+            self._pi = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+_robot = None
+
+def get_robot():
+    global _robot
+    if _robot is None:
+        _robot = Robot()
+    return _robot
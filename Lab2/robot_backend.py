@@ -0,0 +1,291 @@
+#Import Libraries
+import os
+import threading
+import time
+
+# Hardware abstraction layer for the stingray.
+# Every robot module imports gpio, pigpio and clock from here instead of
+# RPi.GPIO, pigpio and time. On the robot these are the real libraries; with
+# STINGRAY_SIM=1 they are replaced by a deterministic simulator running on a
+# virtual clock, so the control stack can be run and profiled on any Linux box.
+
+SIMULATED = os.environ.get("STINGRAY_SIM", "0") == "1"
+
+
+class RealClock:
+    # Thin wrapper around the time module so modules can share one time source
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    # Waits until event is set or timeout expires, returns the event state
+    def wait(self, event, timeout):
+        return event.wait(timeout)
+
+
+class SimClock:
+    # Virtual clock: sleep() advances time instantly instead of blocking, and
+    # every time() read costs pollCost seconds so busy-wait loops terminate.
+    #
+    # The simulation is single-threaded: every thread that sleeps or reads
+    # the clock moves it forward for all of them, so two loops running side
+    # by side each see the other's time pass and overrun. Background loops
+    # (telemetry.EncoderSampler, hcsr04.HCSR04.start) therefore do not start
+    # a thread under SIMULATED; their owners sample or trigger them inline.
+    def __init__(self, pollCost=0.00001):
+        self.now = 0.0
+        self.pollCost = pollCost
+        self.lock = threading.RLock()
+        self.listeners = []
+        self.stepping = False
+
+    def addListener(self, listener):
+        self.listeners.append(listener)
+
+    def advance(self, seconds):
+        with self.lock:
+            # Callbacks fired by the world read the clock without moving it
+            if self.stepping:
+                return
+            target = self.now + max(seconds, 0.0)
+            # Let the world fire the events that happen before the target
+            self.stepping = True
+            try:
+                for listener in self.listeners:
+                    listener(self.now, target)
+            finally:
+                self.stepping = False
+            self.now = target
+
+    def time(self):
+        self.advance(self.pollCost)
+        return self.now
+
+    def monotonic(self):
+        return self.time()
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    # Events set by simulated interrupts only happen while the clock moves,
+    # so step the clock until the event fires or the timeout expires
+    def wait(self, event, timeout, step=0.0001):
+        deadline = self.now + timeout
+        while not event.is_set() and self.now < deadline:
+            self.advance(min(step, deadline - self.now))
+        return event.is_set()
+
+
+class SimWorld:
+    # Physical model of the robot used by the simulated backends.
+    # Servo pulsewidths (BCM pins, pigpio) drive virtual wheels which produce
+    # encoder edges (BOARD pins, RPi.GPIO); the sonar returns an echo whose
+    # length matches obstacleDistance.
+    neutralPw = 1500
+    deadBand = 20
+    ticksPerSecPerUs = 0.15
+    const_cm = 17014.50
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.pulsewidths = {}
+        # servo gpio -> encoder pin
+        self.wheels = {23: 11, 24: 13}
+        self.phase = {}
+        self.obstacleDistance = 100.0
+        self.trigPin = 7
+        self.echoPin = 12
+        self.echoGpio = 18  # BCM number of echoPin, used by pigpio
+        self.echoStart = None
+        self.echoEnd = None
+        self.gpio = None
+        # BCM gpio -> list of (edge, func) registered by SimPi.callback
+        self.pigpioCallbacks = {}
+        clock.addListener(self.step)
+
+    def setPulsewidth(self, servo, pw):
+        self.pulsewidths[servo] = pw
+
+    def tickRate(self, servo):
+        pw = self.pulsewidths.get(servo, 0)
+        if pw == 0 or abs(pw - self.neutralPw) <= self.deadBand:
+            return 0.0
+        return (abs(pw - self.neutralPw) - self.deadBand) * self.ticksPerSecPerUs
+
+    def step(self, start, end):
+        # Emit every encoder edge that falls inside [start, end) in time order
+        events = []
+        for servo, pin in self.wheels.items():
+            rate = self.tickRate(servo)
+            if rate <= 0:
+                continue
+            phase = self.phase.get(servo, 0.0)
+            edgeTime = start + (1.0 - phase) / rate
+            while edgeTime < end:
+                events.append((edgeTime, pin))
+                edgeTime += 1.0 / rate
+            self.phase[servo] = (phase + (end - start) * rate) % 1.0
+        # Echo rising and falling edges of the sonar
+        for when in (self.echoStart, self.echoEnd):
+            if when is not None and start <= when < end:
+                events.append((when, self.echoPin))
+        events.sort()
+        for when, pin in events:
+            self.clock.now = when
+            if self.gpio is not None:
+                self.gpio.fireEdge(pin)
+            if pin == self.echoPin:
+                self.firePigpio(self.echoGpio, self.echoLevel(when), when)
+        self.clock.now = start
+
+    def firePigpio(self, gpio, level, when):
+        tick = int(when * 1e6) & 0xFFFFFFFF
+        for edge, func in self.pigpioCallbacks.get(gpio, []):
+            if edge == SimPigpio.EITHER_EDGE or edge == level:
+                func(gpio, level, tick)
+
+    def trigger(self, now):
+        # Falling edge of the trigger starts an echo 0.5 ms later
+        self.echoStart = now + 0.0005
+        self.echoEnd = self.echoStart + self.obstacleDistance / self.const_cm
+
+    def echoLevel(self, now):
+        if self.echoStart is None:
+            return 0
+        if self.echoStart <= now < self.echoEnd:
+            return 1
+        return 0
+
+
+class SimGPIO:
+    # Subset of the RPi.GPIO API used by the stingray modules
+    BOARD = 10
+    BCM = 11
+    IN = 1
+    OUT = 0
+    PUD_UP = 22
+    PUD_DOWN = 21
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, world):
+        self.world = world
+        self.levels = {}
+        self.callbacks = {}
+        world.gpio = self
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None):
+        self.levels.setdefault(pin, 0)
+
+    def output(self, pin, value):
+        previous = self.levels.get(pin, 0)
+        self.levels[pin] = int(bool(value))
+        if pin == self.world.trigPin and previous and not value:
+            self.world.trigger(self.world.clock.now)
+
+    def input(self, pin):
+        if pin == self.world.echoPin:
+            return self.world.echoLevel(self.world.clock.now)
+        return self.levels.get(pin, 0)
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        self.callbacks.setdefault(pin, []).append(callback)
+
+    def add_event_callback(self, pin, callback):
+        self.callbacks.setdefault(pin, []).append(callback)
+
+    def remove_event_detect(self, pin):
+        self.callbacks.pop(pin, None)
+
+    def fireEdge(self, pin):
+        for callback in self.callbacks.get(pin, []):
+            if callback is not None:
+                callback(pin)
+
+    def cleanup(self, *pins):
+        if pins:
+            for pin in pins:
+                self.callbacks.pop(pin, None)
+        else:
+            self.callbacks.clear()
+
+
+class SimPi:
+    # Subset of the pigpio.pi API used by the stingray modules
+    def __init__(self, world):
+        self.world = world
+        self.connected = True
+
+    def set_servo_pulsewidth(self, user_gpio, pulsewidth):
+        self.world.setPulsewidth(user_gpio, pulsewidth)
+        return 0
+
+    def get_servo_pulsewidth(self, user_gpio):
+        return self.world.pulsewidths.get(user_gpio, 0)
+
+    def set_mode(self, gpio, mode):
+        return 0
+
+    # func(gpio, level, tick) on the edges of a gpio, tick in microseconds
+    def callback(self, user_gpio, edge=0, func=None):
+        return SimCallback(self.world, user_gpio, edge, func)
+
+    def stop(self):
+        self.connected = False
+
+
+class SimCallback:
+    # Returned by SimPi.callback, cancel() removes it like pigpio's _callback
+    def __init__(self, world, gpio, edge, func):
+        self.world = world
+        self.gpio = gpio
+        self.entry = (edge, func)
+        world.pigpioCallbacks.setdefault(gpio, []).append(self.entry)
+
+    def cancel(self):
+        callbacks = self.world.pigpioCallbacks.get(self.gpio, [])
+        if self.entry in callbacks:
+            callbacks.remove(self.entry)
+
+
+class SimPigpio:
+    # Stands in for the pigpio module: pigpio.pi() returns a SimPi
+    INPUT = 0
+    OUTPUT = 1
+    FALLING_EDGE = 0
+    RISING_EDGE = 1
+    EITHER_EDGE = 2
+
+    def __init__(self, world):
+        self.world = world
+
+    def pi(self, *args, **kwargs):
+        return SimPi(self.world)
+
+    @staticmethod
+    def tickDiff(t1, t2):
+        return (t2 - t1) & 0xFFFFFFFF
+
+
+if SIMULATED:
+    clock = SimClock()
+    world = SimWorld(clock)
+    gpio = SimGPIO(world)
+    pigpio = SimPigpio(world)
+else:
+    import RPi.GPIO as gpio
+    import pigpio
+    clock = RealClock()
+    world = None
@@ -1,70 +1,73 @@
 #Import Libraries
 import threading
-import time
-from matplotlib.pylab import *
-from mpl_toolkits.axes_grid1 import host_subplot
-import matplotlib.animation as animation
-import pigpio
-import RPi.GPIO as GPIO
-from WheelEncoderGPIO import WheelEncoder
-from PlotDataRobot import multiplePlots
-import matplotlib.pyplot as plt
-
-GPIO.setmode(GPIO.BOARD)
-GPIO.setwarnings(False)
-        
-servos = [23,24]
-raspi= pigpio.pi()
-
-samples = 5
+from robot_backend import clock
+from robot import get_robot
 
-#creation of two encoders using WheelEncoder class
-leftEncoderCount = WheelEncoder(11, 32, 5.65/2)
-rightEncoderCount = WheelEncoder(13, 33, 5.65/2)
+# Motor helpers and the encoder plot. The hardware is owned by the robot
+# context (see robot.py) and set up on first use, so importing this module
+# for the motor functions does not connect to pigpio, register interrupts
+# or load matplotlib.
+robot = get_robot()
+servos = robot.servos
 
+samples = 5
 xmax = 5
-plotData = multiplePlots(leftEncoderCount, rightEncoderCount,
-    samples, xmax)
+
+# leftEncoderCount, rightEncoderCount, raspi and plotData are still
+# available as module attributes, created when first accessed
+def __getattr__(name):
+    if name == 'leftEncoderCount':
+        return robot.leftEncoder
+    if name == 'rightEncoderCount':
+        return robot.rightEncoder
+    if name == 'raspi':
+        return robot.pi
+    if name == 'plotData':
+        return robot.plot(samples, xmax)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 #Returning values to plot the data
 def loopData(self):
-    plotData.updateData()
-    return plotData.p011, plotData.p012, plotData.p021, plotData.p022
+    return robot.plot(samples, xmax).updateData()
 	
 def Left_forward(n):
-    raspi.set_servo_pulsewidth(servos[0], n)
+    robot.setServo(0, n)
     
 def Left_reverse():
-    raspi.set_servo_pulsewidth(servos[0], 1700)
+    robot.setServo(0, 1700)
 	
 def Left_stop():
-    raspi.set_servo_pulsewidth(servos[0], 0)
+    robot.setServo(0, 0)
 
 #Value for servo speed forward now an argument that must be passed    
 def Right_forward(n):
-    raspi.set_servo_pulsewidth(servos[1], n)
+    robot.setServo(1, n)
     
 def Right_reverse():
-    raspi.set_servo_pulsewidth(servos[1], 1300)
+    robot.setServo(1, 1300)
     
 def Right_stop():
-    raspi.set_servo_pulsewidth(servos[1], 0)
+    robot.setServo(1, 0)
 
-#robot forward function takes two arguments for each motors servo speed
-def Robot_forward(n, m):
+#sets both motors servo speeds without waiting, used by the control loop
+def Robot_speed(n, m):
     Left_forward(n)
     Right_forward(m)
-    time.sleep(.1)
+
+#robot forward function takes two arguments for each motors servo speed
+def Robot_forward(n, m):
+    Robot_speed(n, m)
+    clock.sleep(.1)
     
 def Robot_reverse():
     Left_reverse()
     Right_reverse()
-    time.sleep(.1)
+    clock.sleep(.1)
     
 def Robot_stop():
     Left_stop()
     Right_stop()
-    time.sleep(.1)
+    clock.sleep(.1)
         
 def Robot_right():
     Left_forward(1300)
@@ -76,8 +79,7 @@ def Robot_left():
 
 #Function to stop all motors    
 def motorStop():
-    for s in servos:
-        raspi.set_servo_pulsewidth(s,0)
+    robot.stopMotors()
      
 #Function for encoder output takes wheelEncoder object and a name for the encoder as #arguments
 def Encoders(wheelEncoder, name):
@@ -88,7 +90,7 @@ def Encoders(wheelEncoder, name):
         # print("\n{} Ticks: {}".format(name, wheelEncoder.getTicks()))
         # print("\n{} Total Distance: {}cm".format(name, totDist))
         # print("\n{} Total Ticks: {}".format(name, wheelEncoder.getTotalTicks()))
-        time.sleep(0.01)
+        clock.sleep(0.01)
 
 
 #create a function to move the robot, with 2 arguments
@@ -98,16 +100,18 @@ def Encoders(wheelEncoder, name):
 
 def moves(any, any2):
     #wait for the graph to appear on the screen
-    time.sleep(3)
+    clock.sleep(3)
     
     Robot_forward(1700,1300)
-    time.sleep(5)
+    clock.sleep(5)
     Robot_right()
-    time.sleep(1.2)
+    clock.sleep(1.2)
     Robot_forward(1700,1300)
-    time.sleep(5)
+    clock.sleep(5)
     Robot_stop()
 if __name__ == "__main__":
+    import matplotlib.animation as animation
+    import matplotlib.pyplot as plt
     
     #create a thread to call this function
     movementThread = threading.Thread(target = moves, args = ('anything','anything2'))
@@ -115,9 +119,12 @@ if __name__ == "__main__":
     #start the thread
     movementThread.start()
 
+    #sample the encoders at 200 Hz whatever the speed of the plot
+    robot.sampler(rate=200, samples=samples).start()
+
     #Create an animation to plot the data, during 1 minute
-    simulation = animation.FuncAnimation(fig=plotData.f0, func=loopData,
-                        blit=False, frames=200, interval=20, repeat=False)
+    simulation = animation.FuncAnimation(fig=robot.plot(samples, xmax).f0, func=loopData,
+                        blit=True, frames=200, interval=20, repeat=False)
 
     #plotting
     plt.show()
@@ -125,4 +132,4 @@ if __name__ == "__main__":
     plt.close()
 
     #stop the raspberry pi
-    raspi.stop()
+    robot.close()
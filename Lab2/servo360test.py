@@ -1,7 +1,13 @@
 import math
-import time
-import pigpio
-import RPi.GPIO as gpio
+from robot_backend import gpio, pigpio, clock
+
+# Length of one encoder tick and arc travelled by each wheel when the robot
+# turns in place by degree, in the unit of the dimensions given
+def tick_length(diameter_wheels, unitsFC):
+    return math.pi * diameter_wheels / unitsFC
+
+def arc_circle(degree, width_robot):
+    return degree * math.pi * width_robot / 360.0
 
 class MotorControl:
     # These are the fixed dimensions of the stingray
@@ -36,7 +42,7 @@ class MotorControl:
                                   min_pw=min_pw_r, max_pw=max_pw_r, 
                                   min_speed=min_speed_r, max_speed=max_speed_r)
         
-        time.sleep(1)
+        clock.sleep(1)
 
     def get_angle_l(self):
         angle_l = (self.unitsFC - 1) - ((self.l_wheel.read() - self.dcMin_l) * self.unitsFC) / (self.dcMax_l - self.dcMin_l + 1)
@@ -71,16 +77,19 @@ class MotorControl:
         return angle + number_ticks
 
     def tick_length(self):
-        return math.pi * self.diameter_wheels / self.unitsFC
+        return tick_length(self.diameter_wheels, self.unitsFC)
 
     def arc_circle(self, degree):
-        return degree * math.pi * self.width_robot / 360.0
+        return arc_circle(degree, self.width_robot)
 
+    # Number of feedback ticks of each wheel for the move
     def turn(self, degree):
         number_ticks = self.arc_circle(degree) / self.tick_length()
+        return number_ticks
 
     def straight(self, distance_in_mm):
         number_ticks = distance_in_mm / self.tick_length()
+        return number_ticks
 
 class ServoRead:
     def __init__(self, pi, gpio):
@@ -149,14 +158,13 @@ class ServoWrite:
         calculated_pw = self.calc_pw(degree)
         self.set_pw(calculated_pw)
 
-pi = pigpio.pi()
-
 def main():
+    pi = pigpio.pi()
     left_servo = ServoWrite(pi=pi, gpio=23)
     left_servo.set_position(-60)
     right_servo = ServoWrite(pi=pi, gpio=24)
     right_servo.set_position(60)
-    time.sleep(5)
+    clock.sleep(5)
     left_servo.stop()
     right_servo.stop()
     pi.stop()
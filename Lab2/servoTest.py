@@ -1,8 +1,6 @@
 import math
-import time
-import pigpio
 import pid_controller
-import RPi.GPIO as gpio
+from robot_backend import gpio, pigpio, clock
 
 class MotorControl:
     # These are the fixed dimensions of the stingray
@@ -37,7 +35,7 @@ class MotorControl:
                                   min_pw=min_pw_r, max_pw=max_pw_r, 
                                   min_speed=min_speed_r, max_speed=max_speed_r)
         
-        time.sleep(1)
+        clock.sleep(1)
 
     def get_angle_l(self):
         angle_l = (self.unitsFC - 1) - ((self.l_wheel.read() - self.dcMin_l) * self.unitsFC) / (self.dcMax_l - self.dcMin_l + 1)
@@ -157,12 +155,12 @@ def main():
     left_servo.set_position(-60)
     right_servo = ServoWrite(pi=pi, gpio=24)
     right_servo.set_position(60)
-    time.sleep(5)
+    clock.sleep(5)
     left_servo.stop()
     right_servo.stop()
     left_servo.set_position(-180)
     right_servo.set_position(180)
-    time.sleep(5)
+    clock.sleep(5)
     left_servo.stop()
     right_servo.stop()
     
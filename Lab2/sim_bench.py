@@ -0,0 +1,52 @@
+#Import Libraries
+import os
+import time
+
+# Run the control stack on the simulated backend (see robot_backend.py)
+os.environ.setdefault("STINGRAY_SIM", "1")
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from robot_backend import clock, world
+from hcsr04 import HCSR04
+
+# Runs func and reports wall time, simulated time and the speed-up factor
+def bench(name, func, iterations):
+    wallStart = time.perf_counter()
+    simStart = clock.now
+    for _ in range(iterations):
+        func()
+    wall = time.perf_counter() - wallStart
+    sim = clock.now - simStart
+    print("{:<24} {:>6} runs  wall {:8.4f} s  sim {:8.3f} s  x{:.0f}  {:.1f} us/run".format(
+        name, iterations, wall, sim, sim / wall if wall > 0 else 0.0,
+        wall / iterations * 1e6))
+
+def main():
+    sensor = HCSR04(7, 12)
+    world.obstacleDistance = 42.0
+    bench("sonar measure(5)", lambda: sensor.measure(5, "cm"), 200)
+    print("Distance:", sensor.measure(5, "cm"), "cm")
+
+    # Edge-driven mode: count readings published during one simulated
+    # second. There is no trigger thread on the simulator, the loop polls.
+    readings = []
+    sensor.addListener(lambda distance, stamp: readings.append(distance))
+    wallStart = time.perf_counter()
+    simStart = clock.now
+    sensor.start(50, "cm")
+    while clock.now - simStart < 1.0:
+        sensor.getDistance()
+        clock.sleep(min(0.001, max(1.0 - (clock.now - simStart), 0.0)))
+    simTime = clock.now - simStart
+    sensor.stop()
+    print("sonar async 50 Hz: {} readings, {} lost, sim {:.3f} s, wall {:.4f} s".format(
+        len(readings), sensor.timeouts, simTime, time.perf_counter() - wallStart))
+
+    import pid_controller
+    bench("pid straight(1)", lambda: pid_controller.straight(1), 20)
+    print("Left ticks:", pid_controller.robot.leftEncoder.getTotalTicks(),
+          "Right ticks:", pid_controller.robot.rightEncoder.getTotalTicks())
+    print("Loop timing:", pid_controller.lastLoopStats)
+
+if __name__ == "__main__":
+    main()
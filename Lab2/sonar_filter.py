@@ -0,0 +1,152 @@
+#Import Libraries
+from bisect import bisect_left, insort
+from collections import deque
+
+# Streaming filters for the HC-SR04 readings. Every stage takes one new
+# sample in update() and returns the filtered value (None if the sample was
+# rejected), so a fresh distance is available after every pulse.
+#
+# The default thresholds are in cm; defaultFilter(unit=...) scales them to
+# the unit the sensor measures in.
+
+# Size of one cm in each unit of HCSR04.convert
+UNITS = {"cm": 1.0, "in": 1 / 2.54, "ft": 1 / 30.48}
+
+class RollingMedian:
+    # Median of the last `window` samples, kept in a sorted list
+    def __init__(self, window=5):
+        self.window = window
+        self.samples = deque()
+        self.ordered = []
+
+    def update(self, value):
+        self.samples.append(value)
+        insort(self.ordered, value)
+        if len(self.samples) > self.window:
+            old = self.samples.popleft()
+            del self.ordered[bisect_left(self.ordered, old)]
+        return self.median()
+
+    def median(self):
+        n = len(self.ordered)
+        if n == 0:
+            return None
+        if n % 2:
+            return self.ordered[n // 2]
+        return (self.ordered[n // 2 - 1] + self.ordered[n // 2]) / 2.0
+
+    def reset(self):
+        self.samples.clear()
+        self.ordered = []
+
+
+class OutlierRejector:
+    # Drops samples further than maxDeviation from the median of the recent
+    # accepted samples, or outside [minValue, maxValue]. After `maxRejects`
+    # consecutive rejections the new level is accepted (the obstacle moved).
+    def __init__(self, maxDeviation=30.0, window=5, minValue=2.0, maxValue=400.0, maxRejects=3):
+        self.maxDeviation = maxDeviation
+        self.minValue = minValue
+        self.maxValue = maxValue
+        self.maxRejects = maxRejects
+        self.reference = RollingMedian(window)
+        self.rejected = 0
+        self.totalRejected = 0
+
+    def update(self, value):
+        if value < self.minValue or value > self.maxValue:
+            self.totalRejected += 1
+            return None
+        median = self.reference.median()
+        if median is not None and abs(value - median) > self.maxDeviation:
+            self.rejected += 1
+            self.totalRejected += 1
+            if self.rejected <= self.maxRejects:
+                return None
+            self.reference.reset()
+        self.rejected = 0
+        self.reference.update(value)
+        return value
+
+    def reset(self):
+        self.reference.reset()
+        self.rejected = 0
+
+
+class ExponentialSmoother:
+    # y += alpha * (x - y)
+    def __init__(self, alpha=0.5):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+        else:
+            self.value += self.alpha * (value - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+
+
+class Kalman1D:
+    # Constant-position Kalman filter: q is the process noise (how fast the
+    # distance can change between samples) and r the measurement noise, both
+    # as variances in unit^2
+    def __init__(self, q=1.0, r=4.0):
+        self.q = q
+        self.r = r
+        self.value = None
+        self.p = 0.0
+
+    def update(self, value):
+        if self.value is None:
+            self.value = value
+            self.p = self.r
+            return self.value
+        self.p += self.q
+        gain = self.p / (self.p + self.r)
+        self.value += gain * (value - self.value)
+        self.p *= (1.0 - gain)
+        return self.value
+
+    def reset(self):
+        self.value = None
+        self.p = 0.0
+
+
+class FilterPipeline:
+    # Runs the stages in order; a rejected sample stops the chain and
+    # returns None, self.value keeps the last good output. unit is the unit
+    # the thresholds of the stages are in, None if they do not depend on it.
+    def __init__(self, *stages, unit=None):
+        self.stages = list(stages)
+        self.unit = unit
+        self.value = None
+
+    def update(self, value):
+        for stage in self.stages:
+            value = stage.update(value)
+            if value is None:
+                return None
+        self.value = value
+        return self.value
+
+    def reset(self):
+        for stage in self.stages:
+            stage.reset()
+        self.value = None
+
+
+# Default chain for obstacle checks: outlier rejection, 3-sample median and
+# light smoothing. Pass kalman=True to finish with a 1-D Kalman filter instead.
+# The thresholds are scaled from cm to unit ("cm", "in" or "ft").
+def defaultFilter(kalman=False, unit="cm"):
+    if unit not in UNITS:
+        raise ValueError("Invalid unit. Choose 'cm', 'in', or 'ft'.")
+    scale = UNITS[unit]
+    rejector = OutlierRejector(maxDeviation=30.0 * scale, minValue=2.0 * scale, maxValue=400.0 * scale)
+    if kalman:
+        return FilterPipeline(rejector, RollingMedian(3), Kalman1D(q=1.0 * scale ** 2, r=4.0 * scale ** 2), unit=unit)
+    return FilterPipeline(rejector, RollingMedian(3), ExponentialSmoother(0.6), unit=unit)
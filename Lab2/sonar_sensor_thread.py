@@ -1,21 +1,22 @@
-import time
+from robot_backend import clock
 import threading
 from hcsr04 import HCSR04
+from sonar_filter import defaultFilter
 
-samples = 5
+rate = 20
 
 # Creation of sonar sensor
 sensor = HCSR04(7, 12)
 
-# Function for sonar sensor takes HCSR04 object and sample number for accuracy of distance
-def Sonar(sensor, samples):
+# Function for sonar sensor takes HCSR04 object and the reading rate in Hz.
+# The sensor measures in the background (edge-driven), this loop only reports.
+def Sonar(sensor, rate):
+    sensor.start(rate, "cm", filter=defaultFilter(unit="cm"))
     while True:
-        s = time.time()
-        distance = sensor.measure(samples, "cm")
-        e = time.time()
+        distance = sensor.getDistance()
         print("Distance:", distance, "cm")
-        print("Used time:", (e - s), "seconds")
-        time.sleep(0.01)
+        print("Lost echoes:", sensor.timeouts)
+        clock.sleep(1.0 / rate)
 
-sensorThread = threading.Thread(target=Sonar, args=(sensor, samples))
+sensorThread = threading.Thread(target=Sonar, args=(sensor, rate))
 sensorThread.start()
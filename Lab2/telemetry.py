@@ -0,0 +1,112 @@
+#Import Libraries
+import threading
+import numpy as np
+from robot_backend import clock, SIMULATED
+from control_loop import ControlLoop
+from telemetry_log import ENCODERS
+
+# Fixed-capacity telemetry store for long runs. Samples are a timestamp
+# plus a fixed number of float channels, kept in a preallocated ring
+# buffer, so appending costs the same after one minute or one hour and
+# memory never grows.
+#
+# Every sample is written twice, at slot i and slot i + slots, so the
+# newest n samples are always one contiguous slice of the array: last()
+# and window() return numpy views in time order without copying. There is
+# one slot more than the capacity: the slot being written is never part of
+# a view, and count only moves once the sample is complete.
+
+class TelemetryBuffer:
+    def __init__(self, capacity, channels):
+        self.capacity = capacity
+        self.channels = channels
+        self.slots = capacity + 1
+        # Column 0 is the timestamp
+        self.data = np.zeros((2 * self.slots, channels + 1))
+        self.count = 0
+
+    def append(self, timestamp, *values):
+        i = self.count % self.slots
+        row = self.data[i]
+        row[0] = timestamp
+        row[1:] = values
+        self.data[i + self.slots] = row
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # The newest n samples, oldest first: (n, channels + 1) view
+    def last(self, n=None):
+        count = self.count
+        size = min(count, self.capacity)
+        n = size if n is None else min(n, size)
+        end = (count - 1) % self.slots + self.slots + 1 if count > self.slots else count
+        return self.data[end - n:end]
+
+    # The samples of the last `seconds` before the newest one
+    def window(self, seconds):
+        samples = self.last()
+        if len(samples) == 0:
+            return samples
+        start = np.searchsorted(samples[:, 0], samples[-1, 0] - seconds)
+        return samples[start:]
+
+    def latest(self):
+        return self.last(1)[0] if self.count else None
+
+
+class EncoderSampler:
+    # Samples both wheel encoders at a fixed rate on its own thread, so the
+    # telemetry does not depend on how fast (or whether) it is plotted.
+    # There is one writer: readers take views of the buffer without a lock.
+    # Without start(), the owner can call sample() itself instead. With a
+    # recorder (telemetry_log.TelemetryRecorder) every sample is also logged.
+    # Channels: left/right total ticks, distance (cm) and speed (cm/s)
+    LEFT_TICKS, RIGHT_TICKS, LEFT_DIST, RIGHT_DIST, LEFT_SPEED, RIGHT_SPEED = range(1, 7)
+
+    def __init__(self, leftEncoder, rightEncoder, rate=200, capacity=8192, samples=5, recorder=None):
+        self.leftEncoder = leftEncoder
+        self.rightEncoder = rightEncoder
+        self.rate = rate
+        self.samples = samples
+        self.recorder = recorder
+        self.telemetry = TelemetryBuffer(capacity, 6)
+        self.stopEvent = threading.Event()
+        self.thread = None
+        self.stats = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def sample(self):
+        left = self.leftEncoder
+        right = self.rightEncoder
+        values = (left.getTotalTicks(), right.getTotalTicks(),
+                  left.getTotalDistance(), right.getTotalDistance(),
+                  left.getWindowSpeed(self.samples), right.getWindowSpeed(self.samples))
+        now = clock.monotonic()
+        self.telemetry.append(now, *values)
+        if self.recorder is not None:
+            self.recorder.record(ENCODERS, *values, t=now)
+
+    # No thread on the simulator, see robot_backend.SimClock
+    def start(self):
+        if not self.running and not SIMULATED:
+            self.stopEvent.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        def step(dt, i):
+            self.sample()
+            return not self.stopEvent.is_set()
+        self.stats = ControlLoop(self.rate).run(step)
+
+    def stop(self):
+        self.stopEvent.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
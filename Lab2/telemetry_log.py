@@ -0,0 +1,181 @@
+#Import Libraries
+import argparse
+import struct
+import threading
+import numpy as np
+from robot_backend import clock
+
+# Append-only binary log of the robot's sensor and actuator channels.
+# A 16-byte header is followed by fixed-width little-endian records:
+#
+#   header: 8-byte magic b'STGRTLM1', uint32 record size, uint32 reserved
+#   record: float64 t (monotonic), uint16 channel, uint16 reserved,
+#           uint32 seq, float32 values[6]                      (40 bytes)
+#
+# Records are collected in a preallocated batch and written batch by batch,
+# so recording costs one struct.pack_into per sample. A log is read back with
+# one np.memmap (read_log), TelemetryReplay steps through it in time order
+# and replay_pid feeds the recorded ticks back to the wheel PID offline (see
+# the bottom of this file).
+#
+# Channel values (unused slots are 0):
+#   ENCODERS  left ticks, right ticks, left cm, right cm, left cm/s, right cm/s
+#   SONAR     filtered distance, raw distance
+#   MOTORS    left pulsewidth, right pulsewidth
+#   PID       left setpoint, right setpoint, left ticks, right ticks,
+#             left offset, right offset (PID outputs with the heading mixed in)
+#   DETECTION xmin, ymin, xmax, ymax, class id, score
+
+MAGIC = b'STGRTLM1'
+HEADER_SIZE = 16
+RECORD_DTYPE = np.dtype([
+    ('t', '<f8'), ('channel', '<u2'), ('reserved', '<u2'),
+    ('seq', '<u4'), ('values', '<f4', (6,)),
+])
+RECORD = struct.Struct('<dHHI6f')
+ZEROS = (0.0,) * 6
+
+ENCODERS = 1
+SONAR = 2
+MOTORS = 3
+PID = 4
+DETECTION = 5
+CHANNEL_NAMES = {ENCODERS: 'encoders', SONAR: 'sonar', MOTORS: 'motors',
+                 PID: 'pid', DETECTION: 'detection'}
+
+
+class TelemetryRecorder:
+    # record() may be called from several threads (control loop, sonar,
+    # sampler), the batch is protected by a lock
+    def __init__(self, path, batch=256):
+        self.path = path
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC + struct.pack('<II', RECORD.size, 0))
+        self.batch = batch
+        self.buffer = bytearray(batch * RECORD.size)
+        self.size = 0
+        self.seq = 0
+        self.lock = threading.Lock()
+
+    def record(self, channel, *values, t=None):
+        if t is None:
+            t = clock.monotonic()
+        with self.lock:
+            RECORD.pack_into(self.buffer, self.size * RECORD.size, t, channel, 0,
+                             self.seq & 0xFFFFFFFF, *(values + ZEROS[len(values):]))
+            self.seq += 1
+            self.size += 1
+            if self.size == self.batch:
+                self.writeBatch()
+
+    def writeBatch(self):
+        self.file.write(memoryview(self.buffer)[:self.size * RECORD.size])
+        self.size = 0
+
+    def flush(self):
+        with self.lock:
+            self.writeBatch()
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+# Memory-mapped structured array (RECORD_DTYPE) of every record of the log
+def read_log(path):
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+        size = f.seek(0, 2)
+    if header[:8] != MAGIC:
+        raise ValueError("Not a telemetry log: {}".format(path))
+    recordSize, _ = struct.unpack('<II', header[8:])
+    if recordSize != RECORD_DTYPE.itemsize:
+        raise ValueError("Unsupported record size {}".format(recordSize))
+    # A partly written last record is ignored
+    count = (size - HEADER_SIZE) // recordSize
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(count,))
+
+# Records of one channel, in time order
+def channel(log, channelId):
+    return log[log['channel'] == channelId]
+
+
+class TelemetryReplay:
+    # Steps through a log in time order. current(channel) is the newest
+    # record of that channel at the replay time, so readers see the state
+    # the robot saw at that moment.
+    def __init__(self, path):
+        self.log = read_log(path)
+        self.order = np.argsort(self.log['t'], kind='stable')
+        self.position = 0
+        self.latest = {}
+        self.now = float(self.log['t'][self.order[0]]) if len(self.log) else 0.0
+
+    def current(self, channelId):
+        return self.latest.get(channelId)
+
+    # Applies every record up to time t, returns them
+    def advance(self, t):
+        start = self.position
+        while self.position < len(self.order) and self.log['t'][self.order[self.position]] <= t:
+            row = self.log[self.order[self.position]]
+            self.latest[int(row['channel'])] = row
+            self.position += 1
+        self.now = t
+        return self.log[self.order[start:self.position]]
+
+    def done(self):
+        return self.position >= len(self.order)
+
+    def startTime(self):
+        return float(self.log['t'][self.order[0]]) if len(self.log) else 0.0
+
+    def endTime(self):
+        return float(self.log['t'][self.order[-1]]) if len(self.log) else 0.0
+
+# Runs the wheel PID of pid_controller over the recorded encoder ticks and
+# compares its output with the motor commands that were recorded
+def replay_pid(path):
+    import pid_controller
+    replay = TelemetryReplay(path)
+    pidRecords = channel(replay.log, PID)
+    if len(pidRecords) == 0:
+        return None
+    wheelPid = pid_controller.wheelPid
+    setpoint = np.zeros(3)
+    measurement = np.zeros(3)
+    errors = []
+    previous = None
+    for row in pidRecords:
+        values = row['values']
+        if values[0] == 0:
+            # First iteration of a move, move_pid resets the controller
+            wheelPid.reset()
+            previous = None
+        dt = 1.0 / pid_controller.loopRate if previous is None else max(row['t'] - previous, 1e-6)
+        previous = row['t']
+        setpoint[0], setpoint[1] = values[0], values[1]
+        measurement[0], measurement[1] = values[2], values[3]
+        measurement[2] = values[2] - values[3]
+        out = wheelPid.update(setpoint, measurement, dt, pid_controller.wheelFeedForward)
+        offsets = np.clip([out[0] + out[2], out[1] - out[2]], 0, pid_controller.maxSpeed)
+        errors.append(np.abs(offsets - values[4:6]))
+    errors = np.array(errors)
+    return {'records': len(pidRecords), 'meanError': errors.mean(axis=0), 'maxError': errors.max(axis=0)}
+
+# Summary of a log: python3 telemetry_log.py robot.tlm [--pid]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log')
+    parser.add_argument('--pid', action='store_true')  # Re-run the wheel PID on the recorded ticks
+    args = parser.parse_args()
+
+    log = read_log(args.log)
+    print("{} records, {:.3f} s".format(len(log), float(log['t'].max() - log['t'].min()) if len(log) else 0.0))
+    for channelId, name in CHANNEL_NAMES.items():
+        records = channel(log, channelId)
+        if len(records):
+            print("{:<10} {:>8} records, last {}".format(name, len(records), np.round(records['values'][-1], 2)))
+    if args.pid:
+        print("PID replay:", replay_pid(args.log))
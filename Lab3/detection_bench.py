@@ -0,0 +1,79 @@
+#Import Libraries
+import argparse
+import os
+
+from frame_source import open_source
+from interpreter_pool import InferenceWorker
+from detection_post import postprocess, draw_detections
+from stage_timer import StageTimer, RunMonitor, make_report, write_report, print_summary
+
+# Benchmark of the TFLite detection stack of object_detection.py on
+# recorded frames. Every frame goes through the same steps one after the
+# other, so each stage is timed on its own:
+#   capture -> resize (into the input tensor) -> invoke -> postprocess -> render
+#
+# python3 detection_bench.py --modeldir ssd_model --source frames.raw --output bench.jsonl
+
+def run(args):
+    resW, resH = args.resolution.split('x')
+    imW, imH = int(resW), int(resH)
+    current_dir = os.getcwd()
+    model_path = os.path.join(current_dir, args.modeldir, args.graph)
+    with open(os.path.join(current_dir, args.modeldir, args.labels), 'r') as f:
+        labels = [line.strip() for line in f.readlines()]
+    if labels[0] == '???':
+        del(labels[0])
+
+    source = open_source(args.source, (imW, imH), loop=True)
+    worker = InferenceWorker(model_path, args.threads)
+    interpreter = worker.interpreter
+    output_details = worker.output_details
+    timer = StageTimer()
+
+    # Warm up the interpreter before measuring
+    frame = source.capture_array()
+    for _ in range(args.warmup):
+        worker.model_input.load(frame)
+        interpreter.invoke()
+
+    monitor = RunMonitor().start()
+    for _ in range(args.frames):
+        with timer.stage('capture'):
+            frame = source.capture_array()
+        with timer.stage('resize'):
+            worker.model_input.load(frame)
+        with timer.stage('invoke'):
+            interpreter.invoke()
+        with timer.stage('postprocess'):
+            boxes = interpreter.get_tensor(output_details[0]['index'])[0]
+            classes = interpreter.get_tensor(output_details[1]['index'])[0]
+            scores = interpreter.get_tensor(output_details[2]['index'])[0]
+            detections = postprocess(boxes, classes, scores, imW, imH, args.threshold)
+        if not args.headless:
+            with timer.stage('render'):
+                draw_detections(frame, detections, labels)
+    usage = monitor.stop()
+    source.stop()
+
+    return make_report('object_detection', timer, args.frames, usage,
+                       source=args.source, graph=args.graph, resolution=args.resolution,
+                       threads=args.threads, headless=args.headless)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modeldir', required=True)
+    parser.add_argument('--graph', default='detect.tflite')
+    parser.add_argument('--labels', default='labelmap.txt')
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--resolution', default='600x300')
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--source', required=True)  # Video file, image directory or .raw recording
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--headless', action='store_true')  # Skip the render stage
+    parser.add_argument('--output', default='-')  # JSON lines file, '-' for stdout
+    args = parser.parse_args()
+
+    report = run(args)
+    write_report(report, args.output)
+    print_summary(report)
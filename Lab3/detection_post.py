@@ -0,0 +1,104 @@
+#Import Libraries
+import numpy as np
+import cv2
+
+# Vectorized post-processing of the SSD outputs. All boxes are thresholded,
+# scaled to the frame, clipped and filtered by class-aware non-max
+# suppression with array operations; the result is a structured array that
+# the renderer (draw_detections) and the motion code can use directly.
+
+DETECTION_DTYPE = np.dtype([
+    ('xmin', np.int32), ('ymin', np.int32),
+    ('xmax', np.int32), ('ymax', np.int32),
+    ('class_id', np.int32), ('score', np.float32),
+])
+
+EMPTY_DETECTIONS = np.zeros(0, dtype=DETECTION_DTYPE)
+
+# Intersection over union of box (4,) against boxes (n, 4), (x1, y1, x2, y2)
+def iou(box, boxes):
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+# Greedy NMS on boxes sorted by descending score, returns the kept indices.
+# Boxes of different classes are shifted apart so they never suppress each
+# other (class-aware NMS in a single pass).
+def nms(boxes, class_ids, iou_threshold):
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.intp)
+    offset = (class_ids * (boxes.max() + 1.0))[:, None]
+    shifted = boxes + offset
+    order = np.arange(len(boxes))
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        if order.size == 1:
+            break
+        overlap = iou(shifted[best], shifted[order[1:]])
+        order = order[1:][overlap <= iou_threshold]
+    return np.array(keep, dtype=np.intp)
+
+# boxes: (n, 4) normalised (ymin, xmin, ymax, xmax), classes and scores: (n,)
+# Returns a DETECTION_DTYPE array sorted by descending score
+def postprocess(boxes, classes, scores, imW, imH, threshold=0.5, iou_threshold=0.5):
+    mask = (scores > threshold) & (scores <= 1.0)
+    if not mask.any():
+        return EMPTY_DETECTIONS
+    boxes = boxes[mask]
+    classes = classes[mask].astype(np.int32)
+    scores = scores[mask]
+
+    order = np.argsort(-scores, kind='stable')
+    boxes, classes, scores = boxes[order], classes[order], scores[order]
+
+    # Scale (ymin, xmin, ymax, xmax) to pixels and reorder to (x1, y1, x2, y2)
+    pixels = boxes[:, [1, 0, 3, 2]] * np.array([imW, imH, imW, imH], dtype=np.float32)
+    np.clip(pixels, 1, [imW, imH, imW, imH], out=pixels)
+
+    keep = nms(pixels, classes, iou_threshold)
+    detections = np.empty(len(keep), dtype=DETECTION_DTYPE)
+    kept = pixels[keep].astype(np.int32)
+    detections['xmin'] = kept[:, 0]
+    detections['ymin'] = kept[:, 1]
+    detections['xmax'] = kept[:, 2]
+    detections['ymax'] = kept[:, 3]
+    detections['class_id'] = classes[keep]
+    detections['score'] = scores[keep]
+    return detections
+
+# Draws the boxes and labels of detections onto frame (in place). Tracks
+# (tracker.TRACK_DTYPE) are labelled with their track id as well.
+def draw_detections(frame, detections, labels):
+    tracked = 'track_id' in detections.dtype.names
+    for record in detections.tolist():
+        xmin, ymin, xmax, ymax, class_id, score = record[:6]
+        # Draw rectangle
+        cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (10, 255, 0), 2)
+        
+        # Add label
+        object_name = labels[class_id]
+        label = '%s: %d%%' % (object_name, int(score*100))
+        if tracked:
+            label = '#%d %s' % (record[6], label)
+        labelSize, baseLine = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+        label_ymin = max(ymin, labelSize[1] + 10)
+        cv2.rectangle(frame, 
+                      (xmin, label_ymin-labelSize[1]-10), 
+                      (xmin+labelSize[0], label_ymin+baseLine-10), 
+                      (255, 255, 255), 
+                      cv2.FILLED)
+        cv2.putText(frame, 
+                    label, 
+                    (xmin, label_ymin-7), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 
+                    0.7, 
+                    (0, 0, 0), 
+                    2)
+    return frame
@@ -0,0 +1,106 @@
+#Import Libraries
+import argparse
+import json
+import socket
+import struct
+import sys
+
+# Compact detection output for headless runs. Every frame is written as one
+# record, either a JSON line or a little-endian binary record:
+#
+#   header:    uint32 seq, float64 timestamp, uint16 count
+#   detection: int16 xmin, ymin, xmax, ymax, uint16 class id, float32 score
+#
+# The target is a file path, '-' for stdout, or udp://host:port. UDP never
+# blocks the robot: a viewer can attach at any time with
+# `python3 detection_stream.py --listen udp://127.0.0.1:5005`.
+
+HEADER = struct.Struct('<IdH')
+DETECTION = struct.Struct('<4hHf')
+
+def encode_binary(seq, timestamp, detections):
+    parts = [HEADER.pack(seq & 0xFFFFFFFF, timestamp, len(detections))]
+    for (xmin, ymin, xmax, ymax, class_id, score) in detections:
+        parts.append(DETECTION.pack(int(xmin), int(ymin), int(xmax), int(ymax), int(class_id), float(score)))
+    return b''.join(parts)
+
+def decode_binary(data, offset=0):
+    # Returns (seq, timestamp, detections, next offset)
+    seq, timestamp, count = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+    detections = []
+    for _ in range(count):
+        detections.append(DETECTION.unpack_from(data, offset))
+        offset += DETECTION.size
+    return seq, timestamp, detections, offset
+
+def encode_json(seq, timestamp, detections):
+    record = {
+        'seq': seq,
+        't': round(timestamp, 6),
+        'detections': [[int(xmin), int(ymin), int(xmax), int(ymax), int(class_id), round(float(score), 3)]
+                       for (xmin, ymin, xmax, ymax, class_id, score) in detections],
+    }
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+def parse_udp(target):
+    host, port = target[len('udp://'):].rsplit(':', 1)
+    return host, int(port)
+
+
+class DetectionStream:
+    def __init__(self, target, fmt='jsonl'):
+        if fmt not in ('jsonl', 'binary'):
+            raise ValueError("Invalid format. Choose 'jsonl' or 'binary'.")
+        self.encode = encode_json if fmt == 'jsonl' else encode_binary
+        self.sock = None
+        self.file = None
+        if target.startswith('udp://'):
+            self.address = parse_udp(target)
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+        elif target == '-':
+            self.file = sys.stdout.buffer
+        else:
+            self.file = open(target, 'ab')
+        self.dropped = 0
+
+    # detections: iterable of (xmin, ymin, xmax, ymax, class id, score)
+    def write(self, seq, timestamp, detections):
+        data = self.encode(seq, timestamp, detections)
+        if self.sock is not None:
+            try:
+                self.sock.sendto(data, self.address)
+            except OSError:
+                # No room in the socket buffer or nobody listening
+                self.dropped += 1
+        else:
+            self.file.write(data)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+        elif self.file is not None and self.file is not sys.stdout.buffer:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+# Simple viewer: prints the records received on a UDP port
+def listen(target, fmt='jsonl'):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(parse_udp(target))
+    while True:
+        data, _ = sock.recvfrom(65536)
+        if fmt == 'jsonl':
+            print(data.decode().strip())
+        else:
+            seq, timestamp, detections, _ = decode_binary(data)
+            print(seq, round(timestamp, 3), detections)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--listen', default='udp://127.0.0.1:5005')
+    parser.add_argument('--format', default='jsonl')
+    args = parser.parse_args()
+    listen(args.listen, args.format)
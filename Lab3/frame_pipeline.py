@@ -0,0 +1,206 @@
+#Import Libraries
+import threading
+import time
+from collections import deque
+
+# Staged frame pipeline: a source and a chain of stages each run on their
+# own thread and are connected by small bounded queues. When a queue is full
+# the oldest packet is dropped (latest frame wins), so a slow stage never
+# makes the earlier ones wait and the output is always the newest frame.
+
+class FramePacket:
+    # One frame travelling through the pipeline. seq is the camera sequence
+    # number, stamps holds the time each stage finished (time.perf_counter).
+    # run_inference is cleared for frames whose boxes come from the tracker.
+    __slots__ = ('seq', 'timestamp', 'image', 'run_inference', 'boxes', 'classes',
+                 'scores', 'detections', 'tracks', 'stamps')
+
+    def __init__(self, seq, image, timestamp=None):
+        self.seq = seq
+        self.image = image
+        self.run_inference = True
+        self.timestamp = time.perf_counter() if timestamp is None else timestamp
+        self.boxes = None
+        self.classes = None
+        self.scores = None
+        self.detections = None
+        self.tracks = None
+        self.stamps = {}
+
+
+class LatestQueue:
+    # Bounded queue that drops its oldest item instead of blocking the producer
+    def __init__(self, maxsize=1):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.condition:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify()
+
+    # Returns the oldest item, or None on timeout or after close()
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class Stage:
+    # Runs func on every packet of inQueue and forwards the result to
+    # outQueue. func may return None to drop the packet.
+    def __init__(self, name, func, inQueue, outQueue):
+        self.name = name
+        self.func = func
+        self.inQueue = inQueue
+        self.outQueue = outQueue
+        self.processed = 0
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped:
+            packet = self.inQueue.get(timeout=0.1)
+            if packet is None:
+                continue
+            packet = self.func(packet)
+            if packet is None:
+                continue
+            packet.stamps[self.name] = time.perf_counter()
+            self.processed += 1
+            self.outQueue.put(packet)
+
+    def stop(self):
+        self.stopped = True
+
+    def join(self):
+        if self.thread is not None:
+            self.thread.join()
+
+
+class ParallelStage(Stage):
+    # Runs one worker thread per function in funcs (e.g. one per TFLite
+    # interpreter). Packets are handed out in queue order and the results
+    # are put back into that same order before being forwarded.
+    def __init__(self, name, funcs, inQueue, outQueue):
+        Stage.__init__(self, name, None, inQueue, outQueue)
+        self.funcs = list(funcs)
+        self.threads = []
+        self.takeLock = threading.Lock()
+        self.orderLock = threading.Lock()
+        self.nextTicket = 0
+        self.nextOut = 0
+        self.finished = {}
+
+    def start(self):
+        for i, func in enumerate(self.funcs):
+            thread = threading.Thread(target=self.work, args=(func,),
+                                      name='{}-{}'.format(self.name, i), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        self.thread = self.threads[0]
+        return self
+
+    def work(self, func):
+        while not self.stopped:
+            with self.takeLock:
+                packet = self.inQueue.get(timeout=0.1)
+                if packet is None:
+                    continue
+                ticket = self.nextTicket
+                self.nextTicket += 1
+            packet = func(packet)
+            if packet is not None:
+                packet.stamps[self.name] = time.perf_counter()
+            self.release(ticket, packet)
+
+    # Forwards finished packets in ticket order, dropped ones (None) just
+    # advance the order
+    def release(self, ticket, packet):
+        with self.orderLock:
+            self.finished[ticket] = packet
+            while self.nextOut in self.finished:
+                ready = self.finished.pop(self.nextOut)
+                self.nextOut += 1
+                if ready is not None:
+                    self.processed += 1
+                    self.outQueue.put(ready)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+
+class SourceStage(Stage):
+    # First stage: source() is polled for new packets (None means nothing yet)
+    def __init__(self, name, source, outQueue):
+        Stage.__init__(self, name, None, None, outQueue)
+        self.source = source
+
+    def run(self):
+        while not self.stopped:
+            packet = self.source()
+            if packet is None:
+                continue
+            packet.stamps[self.name] = time.perf_counter()
+            self.processed += 1
+            self.outQueue.put(packet)
+
+
+class Pipeline:
+    # source: callable returning a FramePacket (may block until a new frame)
+    # stages: list of (name, func) run in order, each on its own thread. A
+    # list of functions instead of func makes a ParallelStage.
+    # The caller consumes the finished packets with get(), which is where
+    # drawing and display (the sink) happen.
+    def __init__(self, source, stages, queueSize=1):
+        self.queues = [LatestQueue(queueSize) for _ in range(len(stages) + 1)]
+        self.stages = [SourceStage('capture', source, self.queues[0])]
+        for i, (name, func) in enumerate(stages):
+            if isinstance(func, (list, tuple)):
+                stage = ParallelStage(name, func, self.queues[i], self.queues[i + 1])
+            else:
+                stage = Stage(name, func, self.queues[i], self.queues[i + 1])
+            self.stages.append(stage)
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def get(self, timeout=None):
+        return self.queues[-1].get(timeout)
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for queue in self.queues:
+            queue.close()
+        for stage in self.stages:
+            stage.join()
+
+    # Packets processed by each stage and dropped in front of it
+    def stats(self):
+        stats = {}
+        for i, stage in enumerate(self.stages):
+            dropped = self.queues[i - 1].dropped if i > 0 else 0
+            stats[stage.name] = {'processed': stage.processed, 'dropped': dropped}
+        stats['sink'] = {'dropped': self.queues[-1].dropped}
+        return stats
@@ -0,0 +1,201 @@
+#Import Libraries
+import argparse
+import json
+import os
+import time
+import numpy as np
+import cv2
+
+# Frame sources with the same capture_array()/stop() interface as
+# Picamera2, so the detection and face scripts can run on the live camera or
+# on recorded data:
+#
+#   camera             live Picamera2 (default)
+#   path/to/video.mp4  any file cv2.VideoCapture can read
+#   path/to/dir/       the images of a directory in name order
+#   path/to/frames.raw raw uint8 frames, memory-mapped (see RawRecorder)
+#
+# Replay sources run as fast as possible (rate=None) or at a fixed rate, and
+# return None from capture_array() once the recording is exhausted unless
+# loop is set.
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class Pacer:
+    # Sleeps until the next frame deadline; rate=None never sleeps
+    def __init__(self, rate=None):
+        self.period = 1.0 / rate if rate else None
+        self.deadline = None
+
+    def wait(self):
+        if self.period is None:
+            return
+        now = time.perf_counter()
+        if self.deadline is None or now - self.deadline > self.period:
+            self.deadline = now
+        else:
+            time.sleep(max(self.deadline - now, 0.0))
+        self.deadline += self.period
+
+
+class PicameraSource:
+    def __init__(self, resolution=(640, 480), framerate=None, fmt=None, still=False):
+        from picamera2 import Picamera2
+        self.picam2 = Picamera2()
+        main = {"size": resolution}
+        if fmt:
+            main["format"] = fmt
+        controls = {}
+        if framerate:
+            controls["FrameDurationLimits"] = (int(1/framerate * 1000000), 1000000)
+        if still:
+            config = self.picam2.create_still_configuration(main=main)
+        else:
+            config = self.picam2.create_preview_configuration(main=main, controls=controls)
+        self.picam2.configure(config)
+        self.picam2.start()
+
+    def capture_array(self):
+        return self.picam2.capture_array()
+
+    def stop(self):
+        self.picam2.stop()
+
+
+class ReplaySource:
+    # Base class of the recorded sources: subclasses implement count() and
+    # frame(i). resolution resizes the frames, rgb swaps BGR to RGB.
+    def __init__(self, rate=None, loop=False, resolution=None, rgb=False):
+        self.pacer = Pacer(rate)
+        self.loop = loop
+        self.resolution = resolution
+        self.rgb = rgb
+        self.index = 0
+
+    def capture_array(self):
+        if self.index >= self.count():
+            if not self.loop or self.count() == 0:
+                return None
+            self.index = 0
+        self.pacer.wait()
+        frame = self.frame(self.index)
+        self.index += 1
+        if frame is None:
+            return None
+        if self.resolution is not None and (frame.shape[1], frame.shape[0]) != tuple(self.resolution):
+            frame = cv2.resize(frame, tuple(self.resolution))
+        if self.rgb:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return frame
+
+    def stop(self):
+        pass
+
+
+class VideoFileSource(ReplaySource):
+    def __init__(self, path, **kwargs):
+        ReplaySource.__init__(self, **kwargs)
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError("Could not open video " + path)
+        self.frames = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def count(self):
+        return self.frames
+
+    def frame(self, i):
+        if i == 0:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        ok, frame = self.capture.read()
+        return frame if ok else None
+
+    def stop(self):
+        self.capture.release()
+
+
+class ImageDirSource(ReplaySource):
+    def __init__(self, path, **kwargs):
+        ReplaySource.__init__(self, **kwargs)
+        self.paths = sorted(os.path.join(path, name) for name in os.listdir(path)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+
+    def count(self):
+        return len(self.paths)
+
+    def frame(self, i):
+        return cv2.imread(self.paths[i])
+
+
+class RawReplaySource(ReplaySource):
+    # Frames of a .raw file written by RawRecorder, read through np.memmap
+    # without decoding. The shape and dtype are in the .json next to it.
+    def __init__(self, path, copy=True, **kwargs):
+        ReplaySource.__init__(self, **kwargs)
+        with open(os.path.splitext(path)[0] + '.json') as f:
+            meta = json.load(f)
+        height, width, channels = meta['shape']
+        size = os.path.getsize(path)
+        frameBytes = height * width * channels * np.dtype(meta['dtype']).itemsize
+        self.frames = np.memmap(path, dtype=meta['dtype'], mode='r',
+                                shape=(size // frameBytes, height, width, channels))
+        # Frames are copied by default because callers draw on them
+        self.copy = copy
+
+    def count(self):
+        return len(self.frames)
+
+    def frame(self, i):
+        return np.array(self.frames[i]) if self.copy else self.frames[i]
+
+
+class RawRecorder:
+    # Appends frames of one fixed shape to a .raw file for RawReplaySource
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.shape = None
+
+    def write(self, frame):
+        frame = np.ascontiguousarray(frame)
+        if self.shape is None:
+            self.shape = frame.shape
+            with open(os.path.splitext(self.path)[0] + '.json', 'w') as f:
+                json.dump({'shape': list(frame.shape), 'dtype': str(frame.dtype)}, f)
+        elif frame.shape != self.shape:
+            raise ValueError("All frames of a raw recording must have the same shape")
+        self.file.write(frame.tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+# Opens the source described by spec (see the top of this file)
+def open_source(spec=None, resolution=(640, 480), rate=None, loop=False, rgb=False, **camera):
+    if spec is None or spec == 'camera':
+        return PicameraSource(resolution, **camera)
+    replay = {'rate': rate, 'loop': loop, 'resolution': resolution, 'rgb': rgb}
+    if os.path.isdir(spec):
+        return ImageDirSource(spec, **replay)
+    if spec.endswith('.raw'):
+        return RawReplaySource(spec, **replay)
+    return VideoFileSource(spec, **replay)
+
+# Records frames of any source into a raw file: python3 frame_source.py --source camera --record frames.raw
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', default='camera')
+    parser.add_argument('--record', required=True)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--resolution', default='640x480')
+    args = parser.parse_args()
+    resW, resH = args.resolution.split('x')
+
+    source = open_source(args.source, (int(resW), int(resH)))
+    recorder = RawRecorder(args.record)
+    for _ in range(args.frames):
+        frame = source.capture_array()
+        if frame is None:
+            break
+        recorder.write(frame)
+    recorder.close()
+    source.stop()
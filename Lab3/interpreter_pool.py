@@ -0,0 +1,107 @@
+#Import Libraries
+import argparse
+import importlib.util
+import os
+import threading
+import time
+import numpy as np
+
+from tensor_input import TensorInput
+from frame_pipeline import FramePacket, Pipeline
+
+# Import TensorFlow Lite interpreter
+pkg = importlib.util.find_spec('tflite_runtime')
+if pkg:
+    from tflite_runtime.interpreter import Interpreter
+else:
+    from tensorflow.lite.python.interpreter import Interpreter
+
+# Creates an interpreter, num_threads=None keeps the TFLite default
+def make_interpreter(model_path, num_threads=None):
+    if num_threads:
+        interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+    else:
+        interpreter = Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+class InferenceWorker:
+    # One interpreter with its own input tensor. Calling the worker runs the
+    # model on packet.image and stores boxes, classes and scores in the packet
+    # (packets with run_inference cleared are passed through).
+    def __init__(self, model_path, num_threads=None, input_mean=127.5, input_std=127.5):
+        self.interpreter = make_interpreter(model_path, num_threads)
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self.interpreter.get_output_details()
+        self.model_input = TensorInput.fromInterpreter(self.interpreter, input_mean, input_std)
+
+    def __call__(self, packet):
+        if not packet.run_inference:
+            return packet
+        self.model_input.load(packet.image)
+        self.interpreter.invoke()
+        packet.boxes = self.interpreter.get_tensor(self.output_details[0]['index'])[0]
+        packet.classes = self.interpreter.get_tensor(self.output_details[1]['index'])[0]
+        packet.scores = self.interpreter.get_tensor(self.output_details[2]['index'])[0]
+        return packet
+
+
+# Pool of interpreters for a ParallelStage: every interpreter gets its own
+# worker thread and works on every size-th frame
+def make_pool(model_path, size=1, num_threads=None, input_mean=127.5, input_std=127.5):
+    return [InferenceWorker(model_path, num_threads, input_mean, input_std) for _ in range(size)]
+
+
+# Runs frames synthetic frames through a pool of `size` interpreters with
+# num_threads each and returns (fps, mean latency in ms)
+def benchmark(model_path, size, num_threads, frames=100, resolution=(600, 300)):
+    pool = make_pool(model_path, size, num_threads)
+    image = np.random.randint(0, 256, (resolution[1], resolution[0], 3), dtype=np.uint8)
+    count = [0]
+    # At most two frames in flight per interpreter so none are dropped
+    in_flight = threading.Semaphore(2 * size)
+
+    def source():
+        if count[0] >= frames:
+            time.sleep(0.01)
+            return None
+        if not in_flight.acquire(timeout=0.1):
+            return None
+        count[0] += 1
+        return FramePacket(count[0], image)
+
+    pipeline = Pipeline(source, [('infer', pool)], queueSize=size)
+    latencies = []
+    start = time.perf_counter()
+    pipeline.start()
+    last = 0
+    while len(latencies) < frames:
+        packet = pipeline.get(timeout=5.0)
+        if packet is None:
+            break
+        # Results must come out in frame order
+        assert packet.seq > last
+        last = packet.seq
+        latencies.append(time.perf_counter() - packet.timestamp)
+        in_flight.release()
+    elapsed = time.perf_counter() - start
+    pipeline.stop()
+    return len(latencies) / elapsed, 1000 * sum(latencies) / max(len(latencies), 1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modeldir', required=True)
+    parser.add_argument('--graph', default='detect.tflite')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--max_threads', type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    model_path = os.path.join(os.getcwd(), args.modeldir, args.graph)
+    print("interpreters threads      fps  latency(ms)")
+    for size in (1, 2, 4):
+        for num_threads in (1, 2, 4):
+            if size * num_threads > args.max_threads:
+                continue
+            fps, latency = benchmark(model_path, size, num_threads, args.frames)
+            print("{:>12} {:>7} {:>8.2f} {:>12.1f}".format(size, num_threads, fps, latency))
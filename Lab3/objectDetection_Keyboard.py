@@ -8,5 +8,5 @@ import argparse
 keyboardInputThread = threading.Thread(target=keyboardInput.startKeyboard, args=('any1', 'any2'))
 keyboardInputThread.start()
 
-objectDetectionThread = threading.Thread(target=object_detection.detection, args=('any1', 'any2'))
-objectDetectionThread.start()
\ No newline at end of file
+# Detection runs until 'q' or Ctrl-C
+object_detection.run_until_interrupted()
\ No newline at end of file
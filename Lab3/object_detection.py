@@ -4,30 +4,29 @@ import numpy as np
 import sys
 import time
 from threading import Thread
-import importlib.util
 import threading
 
-# Import Picamera2 libraries
-from picamera2 import Picamera2
+# Camera (Picamera2) or recorded frame sources
+from frame_source import open_source
 import cv2  # Still needed for image processing, not camera access
+from interpreter_pool import make_pool
+from detection_post import postprocess as postprocess_detections, draw_detections
+from frame_pipeline import FramePacket, Pipeline
+from detection_stream import DetectionStream
+from tracker import Tracker, tracks_to_array
 
 class Video_Picam2:
-    def __init__(self, resolution=(640, 480), framerate=60):
-        # Initialize Picamera2
-        self.picam2 = Picamera2()
+    def __init__(self, resolution=(640, 480), framerate=60, source=None, source_rate=None, loop=False):
+        # Initialize Picamera2, or a recorded source (see frame_source.py)
+        self.picam2 = open_source(source, resolution, rate=source_rate, loop=loop,
+                                  framerate=framerate, fmt="RGB888")
         
-        # Configure the camera
-        config = self.picam2.create_preview_configuration(
-            main={"size": resolution, "format": "RGB888"},
-            controls={"FrameDurationLimits": (int(1/framerate * 1000000), 1000000)},
-        )
-        self.picam2.configure(config)
-        
-        # Start the camera
-        self.picam2.start()
-        
-        # Get initial frame
+        # Get initial frame, published as seq 0. seq counts the captured
+        # frames, readers wait on the condition for a sequence number they
+        # have not seen yet (start from -1 to get the initial frame)
         self.frame = self.picam2.capture_array()
+        self.seq = 0
+        self.condition = threading.Condition()
         self.stopped = False
     
     def start(self):
@@ -39,11 +38,26 @@ class Video_Picam2:
             if self.stopped:
                 self.picam2.stop()  # Stop the camera when requested
                 return
-            self.frame = self.picam2.capture_array()  # Capture the next frame
+            frame = self.picam2.capture_array()  # Capture the next frame
+            if frame is None:
+                # End of a recorded source
+                self.stopped = True
+                continue
+            with self.condition:
+                self.frame = frame
+                self.seq += 1
+                self.condition.notify_all()
     
     def read(self):
         return self.frame  # Return the most recent frame
     
+    def read_new(self, last_seq, timeout=1.0):
+        # Wait for a frame newer than last_seq, returns (seq, frame)
+        with self.condition:
+            if self.seq <= last_seq:
+                self.condition.wait(timeout)
+            return self.seq, self.frame
+    
     def stop(self):
         self.stopped = True  # Signal the thread to stop
 
@@ -54,6 +68,18 @@ parser.add_argument('--graph', default='detect.tflite')
 parser.add_argument('--labels', default='labelmap.txt')
 parser.add_argument('--threshold', default=0.5)
 parser.add_argument('--resolution', default='600x300')
+parser.add_argument('--threads', type=int, default=None)  # TFLite threads per interpreter
+parser.add_argument('--interpreters', type=int, default=1)  # Interpreters run in parallel
+parser.add_argument('--headless', action='store_true')  # No drawing or display window
+parser.add_argument('--stream', default=None)  # Detection output: file, '-' or udp://host:port
+parser.add_argument('--stream_format', default='jsonl')  # 'jsonl' or 'binary'
+parser.add_argument('--record', default=None)  # Lab2 binary telemetry log, DETECTION channel
+parser.add_argument('--source', default=None)  # Video file, image directory or .raw recording
+parser.add_argument('--source_rate', type=float, default=None)  # Replay rate in fps, default as fast as possible
+parser.add_argument('--loop', action='store_true')  # Replay the recording in a loop
+parser.add_argument('--track', action='store_true')  # Keep track ids across frames
+parser.add_argument('--detect_every', type=int, default=1)  # With --track, run inference every N frames
+parser.add_argument('--kalman', action='store_true')  # Kalman motion model for the tracker
 
 args = parser.parse_args()
 
@@ -64,13 +90,6 @@ minimum_confidence = float(args.threshold)
 resW, resH = args.resolution.split('x')
 imW, imH = int(resW), int(resH)
 
-# Import TensorFlow Lite interpreter
-pkg = importlib.util.find_spec('tflite_runtime')
-if pkg:
-    from tflite_runtime.interpreter import Interpreter
-else:
-    from tensorflow.lite.python.interpreter import Interpreter
-
 # Set up model paths
 current_dir = os.getcwd()
 tflite_directory = os.path.join(current_dir, model, graph_n)
@@ -83,9 +102,13 @@ with open(label_destination, 'r') as f:
 if labels[0] == '???':
     del(labels[0])
 
-# Load TensorFlow Lite model
-model_interpreter = Interpreter(model_path=tflite_directory)
-model_interpreter.allocate_tensors()
+input_mean = 127.5
+input_std = 127.5
+
+# Load TensorFlow Lite model, one interpreter per parallel worker. Each one
+# resizes and normalises frames directly into its own input tensor.
+interpreter_pool = make_pool(tflite_directory, args.interpreters, args.threads, input_mean, input_std)
+model_interpreter = interpreter_pool[0].interpreter
 
 # Get model details
 input_details = model_interpreter.get_input_details()
@@ -95,90 +118,113 @@ width = input_details[0]['shape'][2]
 
 floating_model = (input_details[0]['dtype'] == np.float32)
 
-input_mean = 127.5
-input_std = 127.5
-
 # Initialize Picamera2 for object detection
-camera = Video_Picam2(resolution=(imW, imH), framerate=30).start()
+camera = Video_Picam2(resolution=(imW, imH), framerate=30, source=args.source,
+                      source_rate=args.source_rate, loop=args.loop).start()
 time.sleep(1)  # Allow camera to warm up
 
+# Pipeline stages: capture -> preprocess -> infer -> postprocess run on
+# their own threads (infer on one thread per interpreter), drawing and
+# display happen in detection()
+last_seq = -1
+def capture():
+    global last_seq
+    seq, frame = camera.read_new(last_seq)
+    if frame is None or seq == last_seq:
+        return None
+    last_seq = seq
+    return FramePacket(seq, frame)
+
+def preprocess(packet):
+    # Picam2 returns RGB format already, so no need for BGR to RGB conversion
+    # But we'll make sure we have the right format
+    frame = packet.image
+    if not (frame.shape[2] == 3 and frame.dtype == np.uint8):
+        print("Warning: Unexpected frame format, converting to RGB")
+        packet.image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    # With tracking, frames in between inferences get the predicted boxes
+    if tracker is not None and packet.seq % args.detect_every != 0:
+        packet.run_inference = False
+    return packet
+
+# The tracker runs in the postprocess stage, which sees the frames in order
+tracker = Tracker(kalman=args.kalman) if args.track else None
+
+def postprocess(packet):
+    if packet.run_inference:
+        # Threshold, scale, clip and NMS all boxes at once (detection_post.py)
+        packet.detections = postprocess_detections(packet.boxes, packet.classes, packet.scores,
+                                                   imW, imH, minimum_confidence)
+    if tracker is None:
+        return packet
+    if packet.run_inference:
+        d = packet.detections
+        boxes = np.stack([d['xmin'], d['ymin'], d['xmax'], d['ymax']], axis=1)
+        packet.tracks = tracker.update(boxes, d['class_id'], d['score'])
+    else:
+        packet.tracks = tracker.predict()
+    # Tracks missed by the last inference are kept but not shown
+    packet.detections = tracks_to_array([t for t in packet.tracks if t.misses == 0])
+    return packet
+
+def render(packet):
+    # Draw result boxes
+    return draw_detections(packet.image, packet.detections, labels)
+
+# Detections are written to the stream (if any) for every frame
+stream = DetectionStream(args.stream, args.stream_format) if args.stream else None
+
+# Detections can also go to a robot telemetry log (Lab2/telemetry_log.py),
+# one DETECTION record per box, next to the robot's own channels
+recorder = None
+if args.record:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab2'))
+    from telemetry_log import TelemetryRecorder, DETECTION
+    recorder = TelemetryRecorder(args.record)
+
+# Set to stop detection() from another thread (needed when headless), see
+# run_until_interrupted
+stop_event = threading.Event()
+
 def detection(any1, any2):
     frame_count = 0
+    fps = 0.0
     start_time = cv2.getTickCount()
-    while True:
-        # Get frame from camera
-        original_frame = camera.read()
-        if original_frame is None:
+    pipeline = Pipeline(capture, [
+        ('preprocess', preprocess),
+        ('infer', interpreter_pool),
+        ('postprocess', postprocess),
+    ], queueSize=len(interpreter_pool)).start()
+    while not stop_event.is_set():
+        packet = pipeline.get(timeout=1.0)
+        if packet is None:
+            if camera.stopped:
+                break  # End of a recorded source
             print("Error: Could not capture frame.")
-            continue  # Skip this frame
+            continue  # Wait for the next frame
+
+        if stream is not None:
+            stream.write(packet.seq, packet.timestamp, [d[:6] for d in packet.detections.tolist()])
+        if recorder is not None:
+            for d in packet.detections.tolist():
+                recorder.record(DETECTION, *d[:6])
 
-        # Copy the frame to avoid modification issues
-        frame = original_frame.copy()
-        
-        # Picam2 returns RGB format already, so no need for BGR to RGB conversion
-        # But we'll make sure we have the right format
-        if frame.shape[2] == 3 and frame.dtype == np.uint8:
-            frame_rgb = frame
-        else:
-            print("Warning: Unexpected frame format, converting to RGB")
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-        # Resize to match model input
-        frame_resized = cv2.resize(frame_rgb, (width, height))
-        input_data = np.expand_dims(frame_resized, axis=0)
-        
-        # Normalize pixel values if using a floating model
-        if floating_model:
-            input_data = (np.float32(input_data) - input_mean) / input_std
-            
-        # Perform detection
-        model_interpreter.set_tensor(input_details[0]['index'], input_data)
-        model_interpreter.invoke()
-        
-        # Get detection results
-        boxes = model_interpreter.get_tensor(output_details[0]['index'])[0]
-        classes = model_interpreter.get_tensor(output_details[1]['index'])[0]
-        scores = model_interpreter.get_tensor(output_details[2]['index'])[0]
-        
-        # Draw result boxes
-        for i in range(len(scores)):
-            if ((scores[i] > minimum_confidence) and (scores[i] <= 1.0)):
-                # Get box coordinates
-                ymin = int(max(1, (boxes[i][0] * imH)))
-                xmin = int(max(1, (boxes[i][1] * imW)))
-                ymax = int(min(imH, (boxes[i][2] * imH)))
-                xmax = int(min(imW, (boxes[i][3] * imW)))
-                
-                # Draw rectangle
-                cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), (10, 255, 0), 2)
-                
-                # Add label
-                object_name = labels[int(classes[i])]
-                label = '%s: %d%%' % (object_name, int(scores[i]*100))
-                labelSize, baseLine = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
-                label_ymin = max(ymin, labelSize[1] + 10)
-                cv2.rectangle(frame, 
-                              (xmin, label_ymin-labelSize[1]-10), 
-                              (xmin+labelSize[0], label_ymin+baseLine-10), 
-                              (255, 255, 255), 
-                              cv2.FILLED)
-                cv2.putText(frame, 
-                            label, 
-                            (xmin, label_ymin-7), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 
-                            0.7, 
-                            (0, 0, 0), 
-                            2)
-        
         # frame rate top of screen:
         frame_count+=1
         if frame_count % 30 == 0:
             end_time = cv2.getTickCount()
             time_taken = (end_time - start_time) / cv2.getTickFrequency()
-            fps = frame_count / time_taken
+            fps = 30 / time_taken
             start_time = end_time
+            if args.headless:
+                print(f"FPS: {fps:.2f}")
 
-            cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
+        # Headless runs skip all drawing and display
+        if args.headless:
+            continue
+
+        frame = render(packet)
+        cv2.putText(frame, f"FPS: {fps:.2f}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 0), 2)
 
         # Display the frame
         cv2.imshow('Object Detection with Picam2', frame)
@@ -189,5 +235,29 @@ def detection(any1, any2):
             break
     
     # Clean up
-    cv2.destroyAllWindows()
+    pipeline.stop()
+    print("Pipeline:", pipeline.stats())
+    if stream is not None:
+        stream.close()
+    if recorder is not None:
+        recorder.close()
+    if not args.headless:
+        cv2.destroyAllWindows()
     camera.stop()
+
+# Runs detection() on a worker thread until it ends or Ctrl-C. SIGINT only
+# reaches the main thread, which sets stop_event and waits for the worker
+# to close the stream, the log and the camera.
+def run_until_interrupted():
+    worker = threading.Thread(target=detection, args=('any1', 'any2'))
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        print("\nStopping")
+        stop_event.set()
+        worker.join()
+
+if __name__ == "__main__":
+    run_until_interrupted()
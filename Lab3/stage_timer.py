@@ -0,0 +1,120 @@
+#Import Libraries
+import json
+import math
+import resource
+import sys
+import time
+
+# Timing helpers for the vision benchmarks: per-stage latency samples,
+# process CPU time and peak RSS, reported as one JSON object per run so
+# results can be compared between versions.
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+        self.order = []
+
+    def add(self, name, seconds):
+        if name not in self.samples:
+            self.samples[name] = []
+            self.order.append(name)
+        self.samples[name].append(seconds)
+
+    # with timer.stage('invoke'): ...
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def summary(self):
+        return {name: latency_summary(self.samples[name]) for name in self.order}
+
+
+class _Stage:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(ordered, q):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(math.ceil(q / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'mean_ms': 1000 * sum(ordered) / count if count else 0.0,
+        'p50_ms': 1000 * percentile(ordered, 50),
+        'p90_ms': 1000 * percentile(ordered, 90),
+        'p99_ms': 1000 * percentile(ordered, 99),
+        'max_ms': 1000 * ordered[-1] if count else 0.0,
+    }
+
+
+class RunMonitor:
+    # Wall time, CPU time (user + system, all threads) and peak RSS of a run
+    def start(self):
+        self.wall = time.perf_counter()
+        self.cpu = self.cpu_time()
+        return self
+
+    def cpu_time(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+
+    def stop(self):
+        wall = time.perf_counter() - self.wall
+        cpu = self.cpu_time() - self.cpu
+        # ru_maxrss is in kilobytes on Linux
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        return {
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'cpu_percent': 100 * cpu / wall if wall > 0 else 0.0,
+            'peak_rss_mb': peak,
+        }
+
+
+def make_report(name, timer, frames, usage, **extra):
+    report = {
+        'benchmark': name,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'frames': frames,
+        'fps': frames / usage['wall_s'] if usage['wall_s'] > 0 else 0.0,
+        'stages': timer.summary(),
+    }
+    report.update(usage)
+    report.update(extra)
+    return report
+
+# Appends the report as one JSON line to path, or prints it for '-'
+def write_report(report, path='-'):
+    line = json.dumps(report, sort_keys=True)
+    if path == '-':
+        print(line)
+        sys.stdout.flush()
+    else:
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+def print_summary(report):
+    print("{}: {} frames, {:.2f} FPS, CPU {:.0f}%, peak RSS {:.1f} MB".format(
+        report['benchmark'], report['frames'], report['fps'],
+        report['cpu_percent'], report['peak_rss_mb']), file=sys.stderr)
+    for name, stats in report['stages'].items():
+        print("  {:<12} mean {:7.2f} ms  p50 {:7.2f}  p90 {:7.2f}  p99 {:7.2f}  max {:7.2f}".format(
+            name, stats['mean_ms'], stats['p50_ms'], stats['p90_ms'],
+            stats['p99_ms'], stats['max_ms']), file=sys.stderr)
@@ -0,0 +1,87 @@
+#Import Libraries
+import argparse
+import time
+import numpy as np
+import cv2
+
+# Writes camera frames straight into the TFLite input tensor.
+# cv2.resize renders into the interpreter's own input buffer (obtained
+# through interpreter.tensor()), and float models are normalised in place,
+# so no array is allocated per frame.
+
+class TensorInput:
+    def __init__(self, bufferGetter, height, width, floating, mean=127.5, std=127.5):
+        # bufferGetter returns the (1, height, width, 3) input array. For an
+        # interpreter this must be called again every frame: TFLite does not
+        # allow holding the view across invoke().
+        self.bufferGetter = bufferGetter
+        self.height = height
+        self.width = width
+        self.floating = floating
+        self.mean = mean
+        self.scale = 1.0 / std
+        # uint8 staging image for float models, resized into before the
+        # in-place conversion
+        self.staging = np.empty((height, width, 3), dtype=np.uint8) if floating else None
+
+    @classmethod
+    def fromInterpreter(cls, interpreter, mean=127.5, std=127.5):
+        details = interpreter.get_input_details()[0]
+        height = details['shape'][1]
+        width = details['shape'][2]
+        floating = (details['dtype'] == np.float32)
+        return cls(interpreter.tensor(details['index']), height, width, floating, mean, std)
+
+    # Resizes (and normalises) frame into the input tensor
+    def load(self, frame):
+        target = self.bufferGetter()[0]
+        if not self.floating:
+            cv2.resize(frame, (self.width, self.height), dst=target)
+            return target
+        cv2.resize(frame, (self.width, self.height), dst=self.staging)
+        np.subtract(self.staging, self.mean, out=target, casting='unsafe')
+        target *= self.scale
+        return target
+
+
+# Per-frame preprocessing as it was done before TensorInput, kept for the benchmark
+def legacyPreprocess(frame, width, height, floating, mean=127.5, std=127.5):
+    frame = frame.copy()
+    frame_resized = cv2.resize(frame, (width, height))
+    input_data = np.expand_dims(frame_resized, axis=0)
+    if floating:
+        input_data = (np.float32(input_data) - mean) / std
+    return input_data
+
+# Compares the legacy path with TensorInput on synthetic frames and returns
+# the ms/frame of both
+def benchmark(imW=600, imH=300, width=300, height=300, floating=False, frames=500):
+    frame = np.random.randint(0, 256, (imH, imW, 3), dtype=np.uint8)
+    dtype = np.float32 if floating else np.uint8
+    tensor = np.empty((1, height, width, 3), dtype=dtype)
+    pipeline = TensorInput(lambda: tensor, height, width, floating)
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        legacyPreprocess(frame, width, height, floating)
+    legacy = (time.perf_counter() - start) / frames * 1000
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        pipeline.load(frame)
+    inPlace = (time.perf_counter() - start) / frames * 1000
+    return legacy, inPlace
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resolution', default='600x300')
+    parser.add_argument('--input', default='300x300')
+    parser.add_argument('--frames', type=int, default=500)
+    args = parser.parse_args()
+    imW, imH = [int(v) for v in args.resolution.split('x')]
+    width, height = [int(v) for v in args.input.split('x')]
+
+    for floating in (False, True):
+        legacy, inPlace = benchmark(imW, imH, width, height, floating, args.frames)
+        print("{} model {}x{}: legacy {:.3f} ms/frame, in place {:.3f} ms/frame, saved {:.3f} ms/frame".format(
+            "float" if floating else "uint8", imW, imH, legacy, inPlace, legacy - inPlace))
@@ -0,0 +1,32 @@
+import numpy as np
+from tracker import Tracker
+
+SPEED = np.array([2.0, 1.0, 2.0, 1.0])  # Pixels per frame
+
+# A box moving at constant speed, detected every `every` frames and
+# predicted in between. Returns the largest corner error of the track over
+# the last detection period.
+def follow(every, frames=60):
+    tracker = Tracker()
+    start = np.array([10.0, 20.0, 60.0, 80.0])
+    errors = []
+    for frame in range(frames):
+        box = start + frame * SPEED
+        if frame % every == 0:
+            tracks = tracker.update([box])
+        else:
+            tracks = tracker.predict()
+        assert len(tracks) == 1
+        errors.append(np.abs(tracks[0].box - box).max())
+    return tracks[0], max(errors[-every:])
+
+def test_velocity_every_frame():
+    track, error = follow(1)
+    assert np.allclose(track.velocity, SPEED)
+    assert error < 1e-6
+
+def test_velocity_skipped_frames():
+    for every in (2, 4, 8):
+        track, error = follow(every)
+        assert np.allclose(track.velocity, SPEED)
+        assert error < 1e-6
@@ -0,0 +1,206 @@
+#Import Libraries
+import itertools
+import numpy as np
+
+# Lightweight multi-object tracker. Detections are matched to the existing
+# tracks by IoU (then by centroid distance for fast movers), so every object
+# keeps a stable track id across frames. Between detections, predict()
+# moves the boxes with a constant-velocity model (optionally a Kalman
+# filter), which fills in frames where inference was skipped. Expensive
+# per-object work (e.g. face recognition) can be stored in track.data and
+# done once per track instead of once per frame.
+#
+# Boxes are (xmin, ymin, xmax, ymax) in pixels.
+
+TRACK_DTYPE = np.dtype([
+    ('xmin', np.int32), ('ymin', np.int32),
+    ('xmax', np.int32), ('ymax', np.int32),
+    ('class_id', np.int32), ('score', np.float32),
+    ('track_id', np.int32),
+])
+
+# IoU matrix between boxes a (n, 4) and b (m, 4)
+def iou_matrix(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+# Greedy assignment: repeatedly takes the best remaining pair whose score
+# passes accept(score). Returns a list of (row, column).
+def greedy_match(scores, accept, maximize=True):
+    pairs = []
+    if scores.size == 0:
+        return pairs
+    order = np.argsort(-scores if maximize else scores, axis=None)
+    used_rows, used_cols = set(), set()
+    for flat in order:
+        row, col = divmod(int(flat), scores.shape[1])
+        if row in used_rows or col in used_cols:
+            continue
+        if not accept(scores[row, col]):
+            break
+        pairs.append((row, col))
+        used_rows.add(row)
+        used_cols.add(col)
+    return pairs
+
+
+class KalmanBox:
+    # Constant-velocity Kalman filter on the box centre and size:
+    # state (cx, cy, w, h, vx, vy), measurement (cx, cy, w, h)
+    F = np.eye(6)
+    F[0, 4] = F[1, 5] = 1.0
+    H = np.eye(4, 6)
+
+    def __init__(self, box, q=1.0, r=10.0):
+        self.x = np.zeros(6)
+        self.x[:4] = to_cxcywh(box)
+        self.P = np.diag([r, r, r, r, 100.0, 100.0])
+        self.Q = np.eye(6) * q
+        self.R = np.eye(4) * r
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return to_xyxy(self.x[:4])
+
+    def update(self, box):
+        y = to_cxcywh(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+        return to_xyxy(self.x[:4])
+
+def to_cxcywh(box):
+    return np.array([(box[0] + box[2]) / 2.0, (box[1] + box[3]) / 2.0,
+                     box[2] - box[0], box[3] - box[1]])
+
+def to_xyxy(state):
+    cx, cy, w, h = state
+    return np.array([cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0])
+
+
+class Track:
+    def __init__(self, track_id, box, class_id, score, kalman=False):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=float)
+        self.class_id = class_id
+        self.score = score
+        self.velocity = np.zeros(4)
+        # Last detected box and frames predicted since, for the velocity
+        self.measured = self.box
+        self.frames = 0
+        self.kalman = KalmanBox(self.box) if kalman else None
+        self.hits = 1
+        self.misses = 0
+        self.age = 0
+        # Free slot for per-track results, e.g. a recognised identity
+        self.data = {}
+
+    def predict(self):
+        self.age += 1
+        self.frames += 1
+        if self.kalman is not None:
+            self.box = self.kalman.predict()
+        else:
+            self.box = self.box + self.velocity
+        return self.box
+
+    def update(self, box, score):
+        box = np.asarray(box, dtype=float)
+        if self.kalman is not None:
+            self.box = self.kalman.update(box)
+        else:
+            # Per-frame velocity of the box corners between the last two
+            # detections, smoothed once the track has one
+            velocity = (box - self.measured) / max(self.frames, 1)
+            self.velocity = velocity if self.hits == 1 else 0.5 * self.velocity + 0.5 * velocity
+            self.box = box
+        self.measured = box
+        self.frames = 0
+        self.score = score
+        self.hits += 1
+        self.misses = 0
+
+
+class Tracker:
+    # iou_threshold: minimum IoU to continue a track
+    # max_misses: frames a track survives without a matching detection
+    # class_aware: only match detections of the same class
+    def __init__(self, iou_threshold=0.3, max_misses=5, kalman=False, class_aware=True):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.kalman = kalman
+        self.class_aware = class_aware
+        self.tracks = []
+        self.ids = itertools.count(1)
+
+    # Advances all tracks by one frame without detections (skipped frame)
+    def predict(self):
+        for track in self.tracks:
+            track.predict()
+        return self.tracks
+
+    # boxes: (n, 4), class_ids and scores: (n,). Returns the live tracks.
+    def update(self, boxes, class_ids=None, scores=None):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        n = len(boxes)
+        class_ids = np.zeros(n, dtype=int) if class_ids is None else np.asarray(class_ids)
+        scores = np.ones(n) if scores is None else np.asarray(scores)
+
+        for track in self.tracks:
+            track.predict()
+
+        matched_tracks, matched_dets = set(), set()
+        if self.tracks and n:
+            predicted = np.array([track.box for track in self.tracks])
+            same_class = np.ones((len(self.tracks), n), dtype=bool)
+            if self.class_aware:
+                track_classes = np.array([track.class_id for track in self.tracks])
+                same_class = track_classes[:, None] == class_ids[None, :]
+
+            # First by overlap
+            overlap = np.where(same_class, iou_matrix(predicted, boxes), 0.0)
+            pairs = greedy_match(overlap, lambda v: v >= self.iou_threshold)
+
+            # Then by centroid distance, relative to the track size, for the rest
+            centres_t = (predicted[:, :2] + predicted[:, 2:]) / 2.0
+            centres_d = (boxes[:, :2] + boxes[:, 2:]) / 2.0
+            size = np.maximum(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1])
+            distance = np.linalg.norm(centres_t[:, None, :] - centres_d[None, :, :], axis=2)
+            distance = distance / np.maximum(size[:, None], 1.0)
+            for row, col in pairs:
+                distance[row, :] = np.inf
+                distance[:, col] = np.inf
+            distance[~same_class] = np.inf
+            pairs += greedy_match(distance, lambda v: v < 0.5, maximize=False)
+
+            for row, col in pairs:
+                self.tracks[row].update(boxes[col], float(scores[col]))
+                matched_tracks.add(row)
+                matched_dets.add(col)
+
+        for row, track in enumerate(self.tracks):
+            if row not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for col in range(n):
+            if col not in matched_dets:
+                self.tracks.append(Track(next(self.ids), boxes[col], int(class_ids[col]),
+                                         float(scores[col]), self.kalman))
+        return self.tracks
+
+# Structured array (TRACK_DTYPE) of the tracks, for drawing and streaming
+def tracks_to_array(tracks):
+    out = np.empty(len(tracks), dtype=TRACK_DTYPE)
+    for i, track in enumerate(tracks):
+        out[i] = (int(track.box[0]), int(track.box[1]), int(track.box[2]), int(track.box[3]),
+                  track.class_id, track.score, track.track_id)
+    return out
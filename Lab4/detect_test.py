@@ -1,31 +1,47 @@
 # CEG 4166: Lab 4 - Face detection test.
 
+import argparse
 import numpy as np
 import cv2
 import threading
-import os
-from picamera2 import Picamera2
 import time
+import os
+import sys
+# frame_source is shared with Lab3
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab3'))
+from frame_source import open_source
+from face_scheduler import FaceDetectScheduler
 
-# Initialize Picamera2
-picam2 = Picamera2()
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('--source', default=None)  # Video file, image directory or .raw recording
+parser.add_argument('--source_rate', type=float, default=None)  # Replay rate in fps, default as fast as possible
+parser.add_argument('--loop', action='store_true')  # Replay the recording in a loop
+parser.add_argument('--full_every', type=int, default=5)  # Full-frame detection every K frames, 1 = always
+parser.add_argument('--downscale', type=float, default=1.0)  # Scale of the image for full-frame detection
+args = parser.parse_args()
 
-# Configure the height and width of the frame.
-config = picam2.create_preview_configuration(main={"size": (640, 480)})
-picam2.configure(config)
-picam2.start()
+# Initialize Picamera2, or a recorded source (see frame_source.py)
+picam2 = open_source(args.source, (640, 480), rate=args.source_rate, loop=args.loop)
 
 # Allow camera to warm up
-time.sleep(2)
+if args.source is None:
+    time.sleep(2)
 
 # Load the face detection model
 cascadePath = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
 faceDetector = cv2.CascadeClassifier(cascadePath)
 
+# Full-frame detection every few frames, padded face regions in between
+scheduler = FaceDetectScheduler(faceDetector, full_every=args.full_every, downscale=args.downscale,
+                                scaleFactor=1.2, minNeighbors=5, minSize=(20, 20))
+
 def face_detection_test(anything1, anything2):
     while True:
         # Capture frame as NumPy array
         img = picam2.capture_array()
+        if img is None:
+            break  # End of a recorded source
         
         # Convert to grayscale
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -35,9 +51,8 @@ def face_detection_test(anything1, anything2):
         # scaleFactor - Specifies how much image size is reduced
         # minNeighbors – This parameter specifies how many neighbors each rectangle will have.
         # minSize – It is the minimum size of the rectangle which can be considered as a face.
-        faces = faceDetector.detectMultiScale(
-            gray, scaleFactor=1.2, minNeighbors=5, minSize=(20, 20)
-        )
+        # The scheduler decides between full-frame and region search
+        faces = scheduler.detect(gray)
         
         # If faces are found, the positions of all the detected faces are returned.
         # Bound by a rectangle with (x,y) set as top left corner, w as the width and h as the height.
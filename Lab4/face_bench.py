@@ -0,0 +1,107 @@
+# CEG 4166: Lab 4 - Benchmark of the face detection and recognition loops.
+import argparse
+import cv2
+import os
+import sys
+# frame_source, tracker and stage_timer are shared with Lab3
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab3'))
+from frame_source import open_source
+from face_scheduler import FaceDetectScheduler
+from tracker import Tracker
+from recognition_cache import RecognitionCache
+from face_dataset import normalize
+from stage_timer import StageTimer, RunMonitor, make_report, write_report, print_summary
+
+# Runs the per-frame work of detect_test.py (--mode detect) or
+# final_FaceRecog.py (--mode recognize) on recorded frames and times every
+# stage: capture -> gray -> detect -> recognize -> render
+#
+# python3 face_bench.py --source faces.raw --mode recognize --output bench.jsonl
+
+font = cv2.FONT_HERSHEY_SIMPLEX
+
+def run(args):
+    source = open_source(args.source, (640, 480), loop=True)
+    cascadePath = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    faceDetector = cv2.CascadeClassifier(cascadePath)
+    # Same detector settings as detect_test.py / final_FaceRecog.py
+    minSize = (20, 20) if args.mode == 'detect' else (24, 24)  # 24x24 is the cascade window
+    scheduler = FaceDetectScheduler(faceDetector, full_every=args.full_every, downscale=args.downscale,
+                                    scaleFactor=1.2, minNeighbors=5, minSize=minSize)
+    recognizer = None
+    if args.mode == 'recognize':
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(args.model)
+
+    # Recognition cached per track, as in final_FaceRecog.py (--per_frame to
+    # recognise every face in every frame). The cache runs on the frame time
+    # at --fps so the result does not depend on the speed of the replay.
+    tracker = Tracker(iou_threshold=0.3, max_misses=5, class_aware=False)
+    cache = RecognitionCache(strong_confidence=50, ttl=1.0, retry_ttl=0.5)
+    predictions = 0
+
+    timer = StageTimer()
+    total_faces = 0
+    monitor = RunMonitor().start()
+    for frame in range(args.frames):
+        now = frame / args.fps
+        with timer.stage('capture'):
+            img = source.capture_array()
+        with timer.stage('gray'):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        with timer.stage('detect'):
+            faces = scheduler.detect(gray)
+        total_faces += len(faces)
+        results = []
+        if recognizer is not None:
+            with timer.stage('recognize'):
+                tracks = tracker.update([(x, y, x + w, y + h) for (x, y, w, h) in faces])
+                cache.prune(track.track_id for track in tracks)
+                for track in tracks:
+                    if track.misses > 0:
+                        continue
+                    x0, y0, x1, y1 = [max(int(v), 0) for v in track.box]
+                    crop = gray[y0:y1, x0:x1]
+                    identity = None if args.per_frame else cache.lookup(track.track_id, crop, track.box, now)
+                    if identity is None:
+                        identity = recognizer.predict(normalize(crop))
+                        cache.store(track.track_id, crop, track.box, identity[0], identity[1], now)
+                        predictions += 1
+                    results.append(identity)
+                faces = [(int(t.box[0]), int(t.box[1]), int(t.box[2] - t.box[0]), int(t.box[3] - t.box[1]))
+                         for t in tracks if t.misses == 0]
+        if not args.headless:
+            with timer.stage('render'):
+                for i, (x, y, w, h) in enumerate(faces):
+                    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+                    if results:
+                        id, confidence = results[i]
+                        cv2.putText(img, str(id), (x + 5, y - 5), font, 1, (255, 255, 255), 2)
+                        cv2.putText(img, " {0}%".format(round(100 - confidence)), (x + 5, y + h - 5), font, 1, (255, 255, 0), 1)
+    usage = monitor.stop()
+    source.stop()
+
+    return make_report('face_' + args.mode, timer, args.frames, usage,
+                       source=args.source, faces=total_faces, headless=args.headless,
+                       full_every=args.full_every, downscale=args.downscale,
+                       full_runs=scheduler.full_runs, roi_runs=scheduler.roi_runs,
+                       predictions=predictions, per_frame=args.per_frame,
+                       cache_hits=cache.hits, cache_misses=cache.misses)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', required=True)  # Video file, image directory or .raw recording
+    parser.add_argument('--mode', default='recognize', choices=['detect', 'recognize'])
+    parser.add_argument('--model', default='model.yml')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--full_every', type=int, default=5)  # 1 = full-frame detection on every frame
+    parser.add_argument('--downscale', type=float, default=1.0)
+    parser.add_argument('--per_frame', action='store_true')  # Recognise every face in every frame
+    parser.add_argument('--fps', type=float, default=30.0)  # Frame rate of the recording, clock of the cache
+    parser.add_argument('--headless', action='store_true')  # Skip the render stage
+    parser.add_argument('--output', default='-')  # JSON lines file, '-' for stdout
+    args = parser.parse_args()
+
+    report = run(args)
+    write_report(report, args.output)
+    print_summary(report)
@@ -0,0 +1,200 @@
+# CEG 4166: Lab 4 - Packed face dataset.
+import argparse
+import cv2
+import json
+import numpy as np
+import os
+import queue
+import threading
+import uuid
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Face crops are stored in one file instead of one JPEG per crop:
+#
+#   faces.raw   uint8 crops of one fixed size (gray, resized), back to back
+#   faces.ids   int32 face id of every crop, in the same order
+#   faces.json  {"size": [width, height], "format": FORMAT, "id": random id}
+#
+# Enrolment appends a crop with two small writes, and training reads the
+# whole set with one np.memmap. The id file is written after the crop, so
+# its length is the number of complete records even after a crash.
+#
+# FORMAT versions how crops are prepared (normalize). A model trained from
+# the dataset records the format, the dataset id and how many records it
+# was trained on next to the model file (write_model_info). model.py
+# resumes from there, or retrains from scratch when any of them does not
+# match (trained_records).
+#
+# An old folder of Tag.{id}.{count}.jpg files is converted with
+# `python3 face_dataset.py --import Dataset_Faces`.
+
+SIZE = (100, 100)
+FORMAT = 2  # 1: crops as detected (JPEG files), 2: normalize()
+
+# Gray crop resized to the dataset size, for storing and for predict
+def normalize(crop, size=SIZE):
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    interpolation = cv2.INTER_AREA if crop.shape[1] > size[0] else cv2.INTER_LINEAR
+    return cv2.resize(crop, size, interpolation=interpolation)
+
+
+# Metadata of a model trained from a dataset, stored as {model}.json
+def model_info_path(model_path):
+    return model_path + '.json'
+
+# records is the number of dataset records the model was trained on
+def write_model_info(model_path, dataset, records):
+    info = {'size': list(dataset.size), 'format': dataset.format, 'dataset': dataset.id,
+            'records': records, 'ids_crc': dataset.ids_crc(records)}
+    with open(model_info_path(model_path), 'w') as f:
+        json.dump(info, f)
+
+# Number of records of the dataset the model was trained on, or None when
+# it has to be retrained: no metadata (models older than FORMAT were
+# trained on raw crops), another crop format or size, or another dataset,
+# including one replaced under the same path.
+def trained_records(model_path, dataset):
+    try:
+        with open(model_info_path(model_path)) as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        return None
+    records = info.get('records', -1)
+    if (info.get('format') != dataset.format or tuple(info.get('size', ())) != tuple(dataset.size)
+            or info.get('dataset') != dataset.id or not 0 <= records <= len(dataset)
+            or info.get('ids_crc') != dataset.ids_crc(records)):
+        return None
+    return records
+
+
+class FaceDataset:
+    def __init__(self, path='Dataset_Faces', size=SIZE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.crops_path = os.path.join(path, 'faces.raw')
+        self.ids_path = os.path.join(path, 'faces.ids')
+        meta_path = os.path.join(path, 'faces.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            size = tuple(meta['size'])
+            if meta.get('format', FORMAT) != FORMAT:
+                raise ValueError("Unsupported dataset format {} in {}".format(meta['format'], meta_path))
+        else:
+            meta = {'size': list(size), 'format': FORMAT}
+        if 'id' not in meta:
+            meta['id'] = uuid.uuid4().hex
+            with open(meta_path, 'w') as f:
+                json.dump(meta, f)
+        self.id = meta['id']
+        self.size = size
+        self.format = FORMAT
+        self.record = size[0] * size[1]
+        self.crops_file = None
+        self.ids_file = None
+
+    def __len__(self):
+        if not os.path.exists(self.ids_path):
+            return 0
+        return os.path.getsize(self.ids_path) // 4
+
+    # CRC32 of the ids of the first count records
+    def ids_crc(self, count):
+        if count == 0:
+            return 0
+        with open(self.ids_path, 'rb') as f:
+            return zlib.crc32(f.read(count * 4))
+
+    def open_append(self):
+        count = len(self)
+        # Drop a crop whose id was never written
+        with open(self.crops_path, 'ab') as f:
+            f.truncate(count * self.record)
+        with open(self.ids_path, 'ab') as f:
+            f.truncate(count * 4)
+        self.crops_file = open(self.crops_path, 'ab')
+        self.ids_file = open(self.ids_path, 'ab')
+
+    def append(self, face_id, crop):
+        if self.crops_file is None:
+            self.open_append()
+        self.crops_file.write(normalize(crop, self.size).tobytes())
+        self.crops_file.flush()
+        self.ids_file.write(np.int32(face_id).astype('<i4').tobytes())
+        self.ids_file.flush()
+
+    # Returns (crops, ids): an (n, height, width) memmap and an (n,) array.
+    # start skips the first records, e.g. the ones already trained.
+    def load(self, start=0):
+        count = len(self)
+        ids = np.fromfile(self.ids_path, dtype='<i4', count=count) if count else np.zeros(0, np.int32)
+        if count == 0:
+            return np.zeros((0, self.size[1], self.size[0]), np.uint8), ids
+        crops = np.memmap(self.crops_path, dtype=np.uint8, mode='r',
+                          shape=(count, self.size[1], self.size[0]))
+        return crops[start:], ids[start:].astype(np.int32)
+
+    def close(self):
+        if self.crops_file is not None:
+            self.crops_file.close()
+            self.ids_file.close()
+            self.crops_file = self.ids_file = None
+
+
+class DatasetWriter:
+    # Appends crops to a dataset on a background thread, so the capture
+    # loop never waits for the disk
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.queue = queue.Queue()
+        self.written = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def append(self, face_id, crop):
+        self.queue.put((face_id, crop.copy()))
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.dataset.append(*item)
+            self.written += 1
+
+    # Waits for the queued crops and closes the dataset
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.dataset.close()
+
+def load_jpeg(image_path):
+    crop = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    return None if crop is None else normalize(crop)
+
+# Appends the Tag.{id}.{count}.jpg files of path, decoded in a process pool
+def import_jpegs(path, dataset, workers=None):
+    names = sorted(name for name in os.listdir(path) if name.endswith('.jpg'))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        paths = [os.path.join(path, name) for name in names]
+        for name, crop in zip(names, pool.map(load_jpeg, paths, chunksize=16)):
+            if crop is not None:
+                dataset.append(int(name.split(".")[1]), crop)
+    return len(names)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dataset', default='Dataset_Faces')
+    parser.add_argument('--import', dest='jpegs', default=None)  # Folder of Tag.{id}.{count}.jpg files
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    dataset = FaceDataset(args.dataset)
+    if args.jpegs:
+        print("Imported {0} images".format(import_jpegs(args.jpegs, dataset, args.workers)))
+        dataset.close()
+    crops, ids = dataset.load()
+    for face_id, count in zip(*np.unique(ids, return_counts=True)):
+        print("Face id {0}: {1} crops".format(face_id, count))
@@ -0,0 +1,62 @@
+# CEG 4166: Lab 4 - Quality gate for enrolment crops.
+import cv2
+import numpy as np
+from face_dataset import normalize
+
+# Decides which detected faces are worth keeping as training samples:
+#   partial:    the box touches the edge of the frame
+#   sharpness:  variance of the Laplacian of the normalised crop (blur, low)
+#   asymmetry:  mean difference between the crop and its mirror image, high
+#               for faces turned away from the camera
+#   duplicate:  mean difference to the closest sample kept so far, low when
+#               nothing changed since the last sample
+#   throttle:   at most one sample every min_interval seconds
+# Every threshold is in gray levels (0-255) and can be tuned per camera.
+
+class EnrolmentGate:
+    def __init__(self, min_sharpness=50.0, max_asymmetry=40.0, min_difference=8.0,
+                 min_interval=0.1, edge_margin=4):
+        self.min_sharpness = min_sharpness
+        self.max_asymmetry = max_asymmetry
+        self.min_difference = min_difference
+        self.min_interval = min_interval
+        self.edge_margin = edge_margin
+        # 32x32 equalised thumbnails of the kept samples, for duplicates
+        self.thumbnails = []
+        self.last_time = None
+        self.rejected = {'partial': 0, 'sharpness': 0, 'asymmetry': 0, 'duplicate': 0, 'throttle': 0}
+
+    # Returns (accepted, reason, scores) for the (x, y, w, h) box of gray
+    def check(self, gray, box, now):
+        x, y, w, h = box
+        height, width = gray.shape[:2]
+        scores = {}
+        if now is not None and self.last_time is not None and now - self.last_time < self.min_interval:
+            return self.reject('throttle', scores)
+        m = self.edge_margin
+        if x < m or y < m or x + w > width - m or y + h > height - m:
+            return self.reject('partial', scores)
+
+        crop = normalize(gray[y:y + h, x:x + w])
+        scores['sharpness'] = cv2.Laplacian(crop, cv2.CV_32F).var()
+        if scores['sharpness'] < self.min_sharpness:
+            return self.reject('sharpness', scores)
+
+        equalized = cv2.equalizeHist(crop)
+        scores['asymmetry'] = cv2.absdiff(equalized, cv2.flip(equalized, 1)).mean()
+        if scores['asymmetry'] > self.max_asymmetry:
+            return self.reject('asymmetry', scores)
+
+        thumbnail = cv2.resize(equalized, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+        if self.thumbnails:
+            scores['difference'] = min(np.abs(thumbnail - other).mean() for other in self.thumbnails)
+            if scores['difference'] < self.min_difference:
+                return self.reject('duplicate', scores)
+
+        self.thumbnails.append(thumbnail)
+        self.last_time = now
+        return True, None, scores
+
+    def reject(self, reason, scores):
+        self.rejected[reason] += 1
+        return False, reason, scores
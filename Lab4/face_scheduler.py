@@ -0,0 +1,96 @@
+# CEG 4166: Lab 4 - Region-of-interest scheduling for Haar face detection.
+import cv2
+import numpy as np
+
+# Haar detection over the full 640x480 frame is the most expensive step of
+# the face loops. The scheduler only runs it every full_every frames, when
+# the scene changes (motion), or after a face was lost. In the frames in
+# between it searches a padded region around each face found last time,
+# limited to sizes close to that face, which is several times cheaper, and
+# skips detection entirely on a steady scene without faces.
+# downscale < 1 runs the full-frame search on a smaller image.
+
+class FaceDetectScheduler:
+    def __init__(self, detector, full_every=5, padding=0.5, downscale=1.0,
+                 motion_threshold=8.0, scaleFactor=1.2, minNeighbors=5, minSize=(20, 20)):
+        self.detector = detector
+        self.full_every = max(1, full_every)
+        self.padding = padding
+        self.downscale = downscale
+        self.motion_threshold = motion_threshold
+        self.scaleFactor = scaleFactor
+        self.minNeighbors = minNeighbors
+        self.minSize = minSize
+        self.faces = np.zeros((0, 4), dtype=np.int32)
+        self.thumbnail = None
+        self.since_full = 0
+        self.full_runs = 0
+        self.roi_runs = 0
+
+    # Mean absolute difference of an 80x60 thumbnail against the previous one
+    def motion(self, gray):
+        thumbnail = cv2.resize(gray, (80, 60), interpolation=cv2.INTER_AREA)
+        previous = self.thumbnail
+        self.thumbnail = thumbnail
+        if previous is None:
+            return True
+        return cv2.absdiff(thumbnail, previous).mean() > self.motion_threshold
+
+    def detect_full(self, gray):
+        self.full_runs += 1
+        if self.downscale >= 1.0:
+            return self.detector.detectMultiScale(
+                gray, scaleFactor=self.scaleFactor, minNeighbors=self.minNeighbors, minSize=self.minSize)
+        small = cv2.resize(gray, None, fx=self.downscale, fy=self.downscale, interpolation=cv2.INTER_AREA)
+        minSize = (max(1, int(self.minSize[0] * self.downscale)), max(1, int(self.minSize[1] * self.downscale)))
+        faces = self.detector.detectMultiScale(
+            small, scaleFactor=self.scaleFactor, minNeighbors=self.minNeighbors, minSize=minSize)
+        if len(faces) == 0:
+            return faces
+        return (np.asarray(faces) / self.downscale).astype(np.int32)
+
+    def detect_roi(self, gray):
+        self.roi_runs += 1
+        height, width = gray.shape[:2]
+        found = []
+        for (x, y, w, h) in self.faces:
+            pad_w, pad_h = int(w * self.padding), int(h * self.padding)
+            x0, y0 = max(0, x - pad_w), max(0, y - pad_h)
+            x1, y1 = min(width, x + w + pad_w), min(height, y + h + pad_h)
+            roi = gray[y0:y1, x0:x1]
+            faces = self.detector.detectMultiScale(
+                roi, scaleFactor=self.scaleFactor, minNeighbors=self.minNeighbors,
+                minSize=(max(self.minSize[0], int(w * 0.6)), max(self.minSize[1], int(h * 0.6))),
+                maxSize=(int(w * 1.5), int(h * 1.5)))
+            for (fx, fy, fw, fh) in faces:
+                box = (fx + x0, fy + y0, fw, fh)
+                # Overlapping regions can find the same face twice
+                if not any(overlaps(box, other) for other in found):
+                    found.append(box)
+        return np.array(found, dtype=np.int32).reshape(-1, 4)
+
+    # Returns the faces of gray as an (n, 4) array of (x, y, w, h)
+    def detect(self, gray):
+        moved = self.motion(gray)
+        self.since_full += 1
+        if moved or self.since_full >= self.full_every:
+            faces = self.detect_full(gray)
+            self.since_full = 0
+        elif len(self.faces) == 0:
+            # Nothing to follow and the scene is steady
+            return self.faces
+        else:
+            faces = self.detect_roi(gray)
+            if len(faces) < len(self.faces):
+                # A face was lost, look for it everywhere on the next frame
+                self.since_full = self.full_every
+        self.faces = np.array(faces, dtype=np.int32).reshape(-1, 4)
+        return self.faces
+
+# True if the two (x, y, w, h) boxes overlap by more than half of the smaller one
+def overlaps(a, b):
+    ix = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    iy = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return False
+    return ix * iy > 0.5 * min(a[2] * a[3], b[2] * b[3])
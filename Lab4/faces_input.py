@@ -1,19 +1,33 @@
 # CEG 4166: Lab 4 - Get input face data.
+import argparse
 import cv2
-import os
 import time
-from picamera2 import Picamera2
+import os
+import sys
+# frame_source is shared with Lab3
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab3'))
+from frame_source import open_source
+from face_dataset import FaceDataset, DatasetWriter
+from face_quality import EnrolmentGate
 
-# Initialize Picamera2
-picam2 = Picamera2()
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('--source', default=None)  # Video file, image directory or .raw recording
+parser.add_argument('--source_rate', type=float, default=None)  # Replay rate in fps, default as fast as possible
+parser.add_argument('--loop', action='store_true')  # Replay the recording in a loop
+parser.add_argument('--samples', type=int, default=50)  # Samples to keep per user
+parser.add_argument('--min_sharpness', type=float, default=50.0)  # Variance of the Laplacian
+parser.add_argument('--max_asymmetry', type=float, default=40.0)  # Difference to the mirror image (pose)
+parser.add_argument('--min_difference', type=float, default=8.0)  # Difference to the closest sample kept
+parser.add_argument('--interval', type=float, default=0.1)  # Minimum time between samples in seconds
+args = parser.parse_args()
 
-# Configure the height and width of the frame.
-config = picam2.create_preview_configuration(main={"size": (640, 480)})
-picam2.configure(config)
-picam2.start()
+# Initialize Picamera2, or a recorded source (see frame_source.py)
+picam2 = open_source(args.source, (640, 480), rate=args.source_rate, loop=args.loop)
 
 # Allow camera to warm up
-time.sleep(2)
+if args.source is None:
+    time.sleep(2)
 
 # Load the face detection model
 cascadePath = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
@@ -24,13 +38,18 @@ faceId = input("\nEnter Face ID (S.No): ")
 print("\nLook at the camera sensor.")
 count = 0
 
-# Ensure dataset directory exists
-dataset_path = "Dataset_Faces"
-os.makedirs(dataset_path, exist_ok=True)
+# Only sharp, frontal, whole faces different enough from the samples kept
+# so far are saved (see face_quality.py). Crops are appended to the packed
+# dataset (see face_dataset.py) on a background thread.
+gate = EnrolmentGate(min_sharpness=args.min_sharpness, max_asymmetry=args.max_asymmetry,
+                     min_difference=args.min_difference, min_interval=args.interval)
+writer = DatasetWriter(FaceDataset("Dataset_Faces"))
 
 while True:
     # Capture frame
     img = picam2.capture_array()
+    if img is None:
+        break  # End of a recorded source
     
     # Convert to grayscale
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
@@ -39,22 +58,27 @@ while True:
     faces = faceDetector.detectMultiScale(gray, 1.3, 5)
     
     for (x, y, w, h) in faces:
-        # Draw rectangle around detected face
-        cv2.rectangle(img, (x, y), (x + w, y + h), (255, 0, 0), 2)
+        accepted, reason, scores = gate.check(gray, (x, y, w, h), time.monotonic())
+        
+        # Draw rectangle around detected face, green when it is kept
+        color = (0, 255, 0) if accepted else (255, 0, 0)
+        cv2.rectangle(img, (x, y), (x + w, y + h), color, 2)
+        if not accepted:
+            continue
         count += 1
         
-        # Save the captured image into the datasets folder
-        face_filename = os.path.join(dataset_path, f"Tag.{faceId}.{count}.jpg")
-        cv2.imwrite(face_filename, gray[y:y + h, x:x + w])
+        # Save the captured face into the dataset
+        writer.append(int(faceId), gray[y:y + h, x:x + w])
         
     # Display the current frame captured
     cv2.imshow("Face Capture", img)
     
-    # Exit on pressing 'ESC' or after capturing 50 images per user
-    k = cv2.waitKey(100) & 0xFF
-    if k == 27 or count >= 50:
+    # Exit on pressing 'ESC' or after capturing the samples of this user
+    k = cv2.waitKey(1) & 0xFF
+    if k == 27 or count >= args.samples:
         break
 
-print("\nCapture complete. Exiting.")
+writer.close()
+print("\nCapture complete, {0} samples kept. Rejected: {1}. Exiting.".format(count, gate.rejected))
 cv2.destroyAllWindows()
 picam2.stop()
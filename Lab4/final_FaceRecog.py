@@ -1,15 +1,48 @@
 # CEG 4166: Lab 4 - Final code for facial recognition.
+import argparse
 import cv2
 import numpy as np
-import os
 import threading
 import time
-from picamera2 import Picamera2
+import os
+import sys
+# frame_source, detection_stream and tracker are shared with Lab3
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lab3'))
+from frame_source import open_source
+from detection_stream import DetectionStream
+from face_scheduler import FaceDetectScheduler
+from tracker import Tracker
+from recognition_cache import RecognitionCache
+from face_dataset import normalize
+
+# Parse command line arguments
+parser = argparse.ArgumentParser()
+parser.add_argument('--headless', action='store_true')  # No drawing or display window
+parser.add_argument('--stream', default=None)  # Face output: file, '-' or udp://host:port
+parser.add_argument('--stream_format', default='jsonl')  # 'jsonl' or 'binary'
+parser.add_argument('--source', default=None)  # Video file, image directory or .raw recording
+parser.add_argument('--source_rate', type=float, default=None)  # Replay rate in fps, default as fast as possible
+parser.add_argument('--loop', action='store_true')  # Replay the recording in a loop
+parser.add_argument('--full_every', type=int, default=5)  # Full-frame detection every K frames, 1 = always
+parser.add_argument('--downscale', type=float, default=1.0)  # Scale of the image for full-frame detection
+args = parser.parse_args()
+
+# Faces are written as (xmin, ymin, xmax, ymax, face id, score) where face
+# id 0 means unknown and score is 1 - confidence / 100
+stream = DetectionStream(args.stream, args.stream_format) if args.stream else None
+
+# Set to stop face_recognition() from another thread (needed when headless),
+# Ctrl-C sets it (see the bottom of this file)
+stop_event = threading.Event()
 
 # Load the face detection model
 cascadePath = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
 faceDetector = cv2.CascadeClassifier(cascadePath)
 
+# Full-frame detection every few frames, padded face regions in between
+scheduler = FaceDetectScheduler(faceDetector, full_every=args.full_every, downscale=args.downscale,
+                                scaleFactor=1.2, minNeighbors=5, minSize=(24, 24))
+
 # Load trained face recognition model
 recognizer = cv2.face.LBPHFaceRecognizer_create()
 recognizer.read('model.yml')
@@ -22,39 +55,78 @@ font = cv2.FONT_HERSHEY_SIMPLEX
 # E.g.: 1 is Jack, 2 is Jane, and 3 is Jill
 name_data = ['none', 'Amine', 'Nizar', 'Akhil']
 
-# Initialize Picamera2
-picam2 = Picamera2()
-config = picam2.create_preview_configuration(main={"size": (640, 480)})
-picam2.configure(config)
-picam2.start()
+# Initialize Picamera2, or a recorded source (see frame_source.py)
+picam2 = open_source(args.source, (640, 480), rate=args.source_rate, loop=args.loop)
 
 # Allow camera to warm up
-time.sleep(2)
+if args.source is None:
+    time.sleep(2)
+
+# Faces keep a track id across frames. Recognition results are cached per
+# track (see recognition_cache.py): confident ones until the track is lost,
+# weak or unknown ones for a short time before predicting again
+tracker = Tracker(iou_threshold=0.3, max_misses=5, class_aware=False)
+cache = RecognitionCache(strong_confidence=50, ttl=1.0, retry_ttl=0.5)
+
+def recognize(gray, track, now):
+    x0, y0, x1, y1 = [int(v) for v in track.box]
+    crop = gray[max(y0, 0):y1, max(x0, 0):x1]
+    identity = cache.lookup(track.track_id, crop, track.box, now)
+    if identity is not None:
+        return identity
+    id, confidence = recognizer.predict(normalize(crop))
+
+    # Check confidence level (lower is better)
+    if confidence >= 100:
+        id = 0
+    cache.store(track.track_id, crop, track.box, id, confidence, now)
+    return id, confidence
 
 def face_recognition(any1, any2):
-    while True:
+    frame_count = 0
+    while not stop_event.is_set():
         # Capture frame
         img = picam2.capture_array()
+        if img is None:
+            break  # End of a recorded source
+        frame_count += 1
+        timestamp = time.monotonic()
         
         # Convert to grayscale
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = faceDetector.detectMultiScale(gray, scaleFactor=1.2, minNeighbors=5)
-        
-        for (x, y, w, h) in faces:
-            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
-            id, confidence = recognizer.predict(gray[y:y + h, x:x + w])
+        faces = scheduler.detect(gray)
+        tracks = tracker.update([(x, y, x + w, y + h) for (x, y, w, h) in faces])
+        cache.prune(track.track_id for track in tracks)
+        results = []
+
+        for track in tracks:
+            if track.misses > 0:
+                continue
+            id, confidence = recognize(gray, track, timestamp)
+            x, y = int(track.box[0]), int(track.box[1])
+            w, h = int(track.box[2]) - x, int(track.box[3]) - y
+            results.append((x, y, x + w, y + h, id, max(100 - confidence, 0) / 100))
             
-            # Check confidence level (lower is better)
-            if confidence < 100:
-                id = name_data[id] if id < len(name_data) else "Unknown"
-                confidence_text = " {0}%".format(round(100 - confidence))
+            # Headless runs skip all drawing
+            if args.headless:
+                continue
+            
+            if id > 0:
+                name = name_data[id] if id < len(name_data) else "Unknown"
             else:
-                id = "Unknown"
-                confidence_text = " {0}%".format(round(100 - confidence))
+                name = "Unknown"
+            confidence_text = " {0}%".format(round(100 - confidence))
             
-            cv2.putText(img, str(id), (x + 5, y - 5), font, 1, (255, 255, 255), 2)
+            cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(img, str(name), (x + 5, y - 5), font, 1, (255, 255, 255), 2)
             cv2.putText(img, str(confidence_text), (x + 5, y + h - 5), font, 1, (255, 255, 0), 1)
         
+        if stream is not None:
+            stream.write(frame_count, timestamp, results)
+        
+        if args.headless:
+            continue
+        
         # Display the frame
         cv2.imshow('Stingray Face Detector', img)
         
@@ -63,9 +135,21 @@ def face_recognition(any1, any2):
             break
     
     print("\nExiting the program")
-    cv2.destroyAllWindows()
+    if stream is not None:
+        stream.close()
+    if not args.headless:
+        cv2.destroyAllWindows()
     picam2.stop()
 
-# Start face recognition in a separate thread
+# Start face recognition in a separate thread. SIGINT only reaches the main
+# thread: on Ctrl-C it sets stop_event and waits for the worker to close the
+# stream and the camera.
 faceRecognitionThread = threading.Thread(target=face_recognition, args=('anything1', 'anything2'))
 faceRecognitionThread.start()
+try:
+    while faceRecognitionThread.is_alive():
+        faceRecognitionThread.join(0.5)
+except KeyboardInterrupt:
+    print("\nStopping")
+    stop_event.set()
+    faceRecognitionThread.join()
@@ -1,62 +1,64 @@
 # CEG 4166: Lab 4 - Face detection training model.
+import argparse
 import cv2
 import numpy as np
-from PIL import Image
 import os
-import time
-from picamera2 import Picamera2
+from face_dataset import FaceDataset, import_jpegs, trained_records, write_model_info
 
-# Initialize Picamera2
-picam2 = Picamera2()
-config = picam2.create_still_configuration(main={"size": (640, 480)})
-picam2.configure(config)
-picam2.start()
+# The face crops of Dataset_Faces are kept in a packed dataset (see
+# face_dataset.py) written by faces_input.py, already gray and resized, so
+# training loads them with one memmap instead of decoding every image and
+# running Haar detection again. The dataset is append-only: the records
+# after the ones already in model.yml are added with recognizer.update, and
+# the model is only trained from scratch when it does not exist yet, was
+# trained on another dataset or crop format (model.yml.json, see
+# face_dataset.py) or with --rebuild. Old Tag.{id}.{count}.jpg files are imported first (in
+# a process pool) when the packed dataset is empty.
+#
+# python3 model.py [--dataset Dataset_Faces] [--model model.yml] [--rebuild]
 
-# Allow camera to warm up
-time.sleep(2)
+if __name__ == "__main__":
+    # Parse command line arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dataset', default='Dataset_Faces')  # Path for the face image database
+    parser.add_argument('--model', default='model.yml')
+    parser.add_argument('--workers', type=int, default=None)  # Processes for importing JPEG files
+    parser.add_argument('--rebuild', action='store_true')  # Retrain from scratch
+    args = parser.parse_args()
 
-# Path for the face image database
-path = 'Dataset_Faces'
+    dataset = FaceDataset(args.dataset)
+    if len(dataset) == 0:
+        import_jpegs(args.dataset, dataset, args.workers)
+        dataset.close()
 
-# Load the face detection model
-cascadePath = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-faceDetector = cv2.CascadeClassifier(cascadePath)
+    # Initialize face recognizer
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
 
-# Initialize face recognizer
-recognizer = cv2.face.LBPHFaceRecognizer_create()
+    # model.yml.json records how many dataset records the model has seen
+    trained = 0
+    if not args.rebuild and os.path.exists(args.model):
+        records = trained_records(args.model, dataset)
+        if records is None:
+            print("\n {} was trained on another dataset or crop format, rebuilding".format(args.model))
+        else:
+            recognizer.read(args.model)
+            trained = records
+    faces, tags = dataset.load(trained)
 
-def training_function(path):
-    images_dataset = [os.path.join(path, char) for char in os.listdir(path) if char.endswith('.jpg')]
-    number_faces = []
-    tags = []
-    
-    for image_path in images_dataset:
-        # Convert to grayscale
-        gray = Image.open(image_path).convert('L')
-        img_128D = np.array(gray, 'uint8')
-        
-        # Extract the face ID from filename
-        face_id = int(os.path.split(image_path)[-1].split(".")[1])
-        faces = faceDetector.detectMultiScale(img_128D)
-        
-        for (x, y, w, h) in faces:
-            number_faces.append(img_128D[y:y + h, x:x + w])
-            tags.append(face_id)
-    
-    return number_faces, tags
+    # The recognizer train/update functions train the FaceRecognizer with the given data
+    # (https://docs.opencv.org/4.0.1/dd/d65/classcv_1_1face_1_1FaceRecognizer.html)
+    if len(faces) > 0:
+        if trained > 0:
+            recognizer.update(list(faces), tags)
+        else:
+            recognizer.train(list(faces), tags)
 
-faces, tags = training_function(path)
-
-# The recognizer train function trains the FaceRecognizer with the given data
-# (https://docs.opencv.org/4.0.1/dd/d65/classcv_1_1face_1_1FaceRecognizer.html)
-if len(faces) > 0:
-    recognizer.train(faces, np.array(tags))
-    
-    # Save the trained model
-    recognizer.write('model.yml')
-    print("\n {0} Faces training done".format(len(np.unique(tags))))
-else:
-    print("\n No faces found for training.")
-
-# Cleanup
-picam2.stop()
+        # Save the trained model
+        recognizer.write(args.model)
+        write_model_info(args.model, dataset, trained + len(faces))
+        print("\n {0} faces of {1} ids, {2} done".format(
+            len(faces), len(np.unique(tags)), 'update' if trained > 0 else 'training'))
+    elif trained > 0:
+        print("\n Model is up to date.")
+    else:
+        print("\n No faces found for training.")
@@ -0,0 +1,113 @@
+# CEG 4166: Lab 4 - Cache of LBPH recognition results.
+import cv2
+import numpy as np
+from face_dataset import normalize
+
+# recognizer.predict is the most expensive step per face. Results are
+# cached per track id:
+#   - confident results (confidence <= strong_confidence, lower is better)
+#     are reused until the track is lost (forget/prune)
+#   - weaker results expire after ttl seconds
+#   - unknown faces (confidence >= 100) are retried after retry_ttl seconds
+# Confident results are also stored under a 64-bit difference hash of the
+# normalised, equalised crop, so a face that is lost and found again under a
+# new track id is recognised without predict as long as it looks the same
+# and reappears near the box where the old track last saw it. When the hash
+# table is full the least confident entry is evicted first.
+
+def crop_hash(crop):
+    # dHash: sign of the horizontal gradient of a 9x8 thumbnail of the
+    # crop at the recognizer size, equalised so lighting does not flip bits
+    face = cv2.equalizeHist(normalize(crop))
+    small = cv2.resize(face, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+# Distance between the centres of two (xmin, ymin, xmax, ymax) boxes, in
+# sizes of the box a
+def box_shift(a, b):
+    size = max(a[2] - a[0], a[3] - a[1], 1.0)
+    return np.hypot((a[0] + a[2] - b[0] - b[2]) / 2.0, (a[1] + a[3] - b[1] - b[3]) / 2.0) / size
+
+
+class RecognitionCache:
+    def __init__(self, strong_confidence=50, ttl=1.0, retry_ttl=0.5,
+                 hash_ttl=5.0, hash_distance=3, max_shift=1.0, max_hashes=32):
+        self.strong_confidence = strong_confidence
+        self.ttl = ttl
+        self.retry_ttl = retry_ttl
+        self.hash_ttl = hash_ttl
+        self.hash_distance = hash_distance
+        # Largest box_shift between a new track and a hashed face
+        self.max_shift = max_shift
+        self.max_hashes = max_hashes
+        # track id -> (id, confidence, expiry time or None, crop hash or None)
+        self.tracks = {}
+        # crop hash -> (id, confidence, expiry time, last box)
+        self.hashes = {}
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the cached (id, confidence) for the track at box, or None
+    def lookup(self, track_id, crop, box, now):
+        entry = self.tracks.get(track_id)
+        if entry is not None:
+            if entry[2] is None or now < entry[2]:
+                key = entry[3]
+                if key in self.hashes:
+                    # Follow the face, a new track must appear near it
+                    id, confidence, expiry, _ = self.hashes[key]
+                    self.hashes[key] = (id, confidence, expiry, box)
+                self.hits += 1
+                return entry[0], entry[1]
+            del self.tracks[track_id]
+
+        if self.hashes:
+            key = crop_hash(crop)
+            for other, (id, confidence, expiry, last) in list(self.hashes.items()):
+                if now >= expiry:
+                    del self.hashes[other]
+                elif hamming(key, other) <= self.hash_distance and box_shift(last, box) <= self.max_shift:
+                    # Same face under a new track id
+                    self.tracks[track_id] = (id, confidence, None, other)
+                    self.hits += 1
+                    return id, confidence
+
+        self.misses += 1
+        return None
+
+    def store(self, track_id, crop, box, id, confidence, now):
+        key = None
+        if confidence >= 100:
+            expiry = now + self.retry_ttl
+        elif confidence > self.strong_confidence:
+            expiry = now + self.ttl
+        else:
+            expiry = None
+            key = crop_hash(crop)
+            self.store_hash(key, id, confidence, box, now)
+        self.tracks[track_id] = (id, confidence, expiry, key)
+
+    def store_hash(self, key, id, confidence, box, now):
+        if key not in self.hashes and len(self.hashes) >= self.max_hashes:
+            # Evict expired entries, then the least confident one
+            for other in [k for k, v in self.hashes.items() if now >= v[2]]:
+                del self.hashes[other]
+            if len(self.hashes) >= self.max_hashes:
+                worst = max(self.hashes, key=lambda k: self.hashes[k][1])
+                if self.hashes[worst][1] <= confidence:
+                    return
+                del self.hashes[worst]
+        self.hashes[key] = (id, confidence, now + self.hash_ttl, box)
+
+    def forget(self, track_id):
+        self.tracks.pop(track_id, None)
+
+    # Drops the entries of tracks that no longer exist
+    def prune(self, live_track_ids):
+        live = set(live_track_ids)
+        for track_id in [t for t in self.tracks if t not in live]:
+            del self.tracks[track_id]